@@ -1,12 +1,19 @@
 import streamlit as st
-from docx import Document
-from pptx import Presentation
-from pptx.enum.shapes import MSO_SHAPE_TYPE
-import fitz  # PyMuPDF
+from redaction import ZIP_MEMBER_BUFFER_SIZE, create_name_matcher, new_output_buffer, open_task_source, redact_task_or_exception
+from cache import RedactionResultCache, run_redaction_tasks, upload_crc_size, zip_member_content_keys
 import io
 import os
 import zipfile
 import re # For regex and splitting
+import functools
+import shutil
+import tempfile
+import contextlib
+import hashlib
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
 
 # --- GLOBAL CONSTANTS ---
 COMMON_HONORIFICS = [
@@ -15,6 +22,19 @@ COMMON_HONORIFICS = [
     "Capt.", "Captain", "Lt.", "Lieutenant", "Fr.", "Father", "Sr.", "Sister"
 ]
 
+POOL_MAX_WORKERS = os.cpu_count() or 1 # Size of the process pool shared by every rerun and session
+# Workers are started from a clean server process, never forked from the multi-threaded Streamlit server
+# (a fork can copy a lock another thread holds and deadlock the worker); spawn where forkserver is unavailable
+POOL_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+POOL_TASKS_IN_FLIGHT_PER_WORKER = 2 # Submitted-but-unfinished pool tasks per worker; keeps queued task payloads bounded
+PROCESSING_LOG_EXPANDED_MAX_LINES = 25 # Longer processing logs start collapsed
+REDACTION_CACHE_MAX_BYTES = 256 << 20 # Total size of redacted outputs remembered across reruns (e.g. clicking "Redact Files" again)
+SUPPORTED_DOCUMENT_EXTENSIONS = frozenset({".docx", ".pptx", ".pdf"}) # Redactable files, at top level or inside ZIPs
+KNOWN_FILE_EXTENSIONS = (".docx", ".pptx", ".pdf", ".zip") # Every extension the handler dispatches on
+ZIP_SKIP_MEMBER_RE = re.compile(r'__MACOSX|.*/\Z', re.DOTALL) # macOS resource forks and directory entries
+NAME_PART_SPLIT_RE = re.compile(r'[\s.-]+') # Splits a name entry into parts (spaces, hyphens, periods)
+FILENAME_PART_SPLIT_RE = re.compile(r'[\s_-]+') # Splits a file name into words for initials
+
 # --- HELPER FUNCTIONS ---
 
 def parse_names_from_ui(names_input_str_ui):
@@ -31,17 +51,17 @@ def generate_name_variations(user_provided_names_list, honorifics_list):
     if not user_provided_names_list:
         return []
 
-    variations = set()
-    normalized_honorifics_set = set(h.lower().replace('.', '') for h in honorifics_list)
+    variations = [] # Collected with duplicates, deduplicated once at the end
+    honorifics_tuple = tuple(honorifics_list) # Original honorifics, to keep their format
+    normalized_honorifics_set = set(h.lower().replace('.', '') for h in honorifics_tuple)
 
     for name_entry in user_provided_names_list:
         original_name_entry = name_entry.strip()
         if not original_name_entry: continue
-        variations.add(original_name_entry)
+        variations.append(original_name_entry)
 
         # Split the entry into parts for analysis (handles spaces, hyphens, periods)
-        name_parts_for_logic = re.split(r'[\s.-]+', original_name_entry)
-        name_parts_for_logic = [p for p in name_parts_for_logic if p] # Clean empty parts
+        name_parts_for_logic = [p for p in NAME_PART_SPLIT_RE.split(original_name_entry) if p]
 
         name_without_honorific = original_name_entry # Default
         if name_parts_for_logic:
@@ -50,181 +70,159 @@ def generate_name_variations(user_provided_names_list, honorifics_list):
                 if len(name_parts_for_logic) > 1:
                     # If "Prof. John Doe", name_without_honorific becomes "John Doe"
                     name_without_honorific = " ".join(name_parts_for_logic[1:])
-                    variations.add(name_without_honorific) # Add "John Doe"
+                    variations.append(name_without_honorific) # Add "John Doe"
             # If no honorific found at the start, name_without_honorific remains original_name_entry
 
         # Now, use 'name_without_honorific' to generate more variations
-        # 1. Add variations WITH all common honorifics
-        for honorific in honorifics_list: # Use original honorifics list to keep their format
-            variations.add(f"{honorific} {name_without_honorific}")
-            # Also add honorific + just the last part if name_without_honorific has multiple words
-            base_name_parts_for_honorific = name_without_honorific.split() # Simple space split
-            if len(base_name_parts_for_honorific) > 1:
-                 variations.add(f"{honorific} {base_name_parts_for_honorific[-1]}") # e.g., "Dr. Doe" from "John Doe"
+        base_parts = name_without_honorific.split() # Simple space split
+        # 1. Forms that also get every common honorific: the name, and its last part if it has several ("Dr. Doe")
+        honorific_bases = [name_without_honorific] if len(base_parts) < 2 else [name_without_honorific, base_parts[-1]]
+        variations.extend(f"{honorific} {base}" for honorific in honorifics_tuple for base in honorific_bases)
 
         # 2. Handle initials and multi-part names from 'name_without_honorific'
-        base_parts = name_without_honorific.split() # Simple space split for this logic
-        
         if len(base_parts) == 1: # Single word like "Young"
-            variations.add(base_parts[0]) # Already added via name_without_honorific usually
-        
+            variations.append(base_parts[0]) # Already added via name_without_honorific usually
+
         elif len(base_parts) == 2: # e.g., "John Doe"
-            first, last = base_parts[0], base_parts[1]
-            variations.add(last) # "Doe"
-            if first and last: # Ensure parts are not empty
-                if len(first)>0 : variations.add(f"{first[0]}. {last}") # "J. Doe"
-                if len(last)>0 : variations.add(f"{first} {last[0]}.") # "John D."
-                if len(first)>0 and len(last)>0 : variations.add(f"{first[0]}.{last[0]}.") # "J.D."
+            first, last = base_parts
+            variations += [
+                last, # "Doe"
+                f"{first[0]}. {last}", # "J. Doe"
+                f"{first} {last[0]}.", # "John D."
+                f"{first[0]}.{last[0]}.", # "J.D."
+            ]
 
         elif len(base_parts) == 3: # e.g., "John King Doe" or "John K Doe" (if K has no period)
-            first, middle, last = base_parts[0], base_parts[1], base_parts[2]
-            variations.add(last) # "Doe"
-            variations.add(f"{first} {last}") # "John Doe"
-            if first and middle and last:
-                if len(first)>0: variations.add(f"{first[0]}. {last}") # "J. Doe" (ignoring middle)
-                if len(first)>0 and len(middle)>0: variations.add(f"{first[0]}. {middle[0]}. {last}") # "J. K. Doe"
-                if len(first)>0 and len(middle)>0: variations.add(f"{first} {middle[0]}. {last}") # "John K. Doe"
-
-    # Final sort and filter: remove very short items (e.g. length 1) unless specifically intended.
+            first, middle, last = base_parts
+            variations += [
+                last, # "Doe"
+                f"{first} {last}", # "John Doe"
+                f"{first[0]}. {last}", # "J. Doe" (ignoring middle)
+                f"{first[0]}. {middle[0]}. {last}", # "J. K. Doe"
+                f"{first} {middle[0]}. {last}", # "John K. Doe"
+            ]
+
+    # Final dedup, sort and filter: remove very short items (e.g. length 1) unless specifically intended.
     # For now, min length 2 seems reasonable to avoid redacting "A" if "A. B. Cee" was processed.
     # This also filters out empty strings that might have crept in.
-    sorted_variations = sorted(list(v for v in variations if v and len(v.strip()) > 1), key=len, reverse=True)
-    return sorted_variations
+    return sorted((v for v in dict.fromkeys(variations) if len(v.strip()) > 1), key=len, reverse=True)
 
 
-def redact_text_in_runs(runs, names_to_redact_variations, redaction_string="[REDACTED]"):
-    """Iterates through runs, uses regex for whole-word, case-insensitive replacement."""
-    modified_in_paragraph = False
-    for run in runs:
-        current_run_text = run.text
-        if not current_run_text.strip(): # Skip empty or whitespace-only runs
-            continue
-        
-        text_modified_in_this_run = False
-        for name_var in names_to_redact_variations:
-            if not name_var: continue # Skip empty variations, should be filtered by generate_name_variations
-
-            # re.escape to handle special characters in names (e.g., "Dr. No")
-            # \b for word boundaries
-            # Using try-except for re.subn as a safeguard
-            try:
-                # Pattern needs to be re-evaluated if current_run_text changed
-                pattern = r'\b' + re.escape(name_var) + r'\b'
-                new_text, num_replacements = re.subn(pattern, redaction_string, current_run_text, flags=re.IGNORECASE)
-                if num_replacements > 0:
-                    current_run_text = new_text # Update text for next variation in this run
-                    text_modified_in_this_run = True
-            except re.error as e:
-                # This should be rare with re.escape, but good to have.
-                st.warning(f"Regex error for name variation '{name_var}': {e}. Skipping this variation for this run segment.")
-                continue
-        
-        if text_modified_in_this_run:
-            run.text = current_run_text # Apply accumulated changes to the run object
-            modified_in_paragraph = True
-            
-    return modified_in_paragraph
-
-def redact_docx(docx_file_stream, names_variations_list, redaction_string):
-    doc = Document(docx_file_stream)
-    modified_doc = False
-    for para in doc.paragraphs:
-        if redact_text_in_runs(para.runs, names_variations_list, redaction_string): modified_doc = True
-    for table in doc.tables:
-        for row in table.rows:
-            for cell in row.cells:
-                for para in cell.paragraphs:
-                    if redact_text_in_runs(para.runs, names_variations_list, redaction_string): modified_doc = True
-    for section in doc.sections:
-        for header_para in section.header.paragraphs:
-            if redact_text_in_runs(header_para.runs, names_variations_list, redaction_string): modified_doc = True
-        for footer_para in section.footer.paragraphs:
-            if redact_text_in_runs(footer_para.runs, names_variations_list, redaction_string): modified_doc = True
-    if modified_doc:
-        bio = io.BytesIO()
-        doc.save(bio)
-        bio.seek(0)
-        return bio
-    return None
-
-def redact_pptx(pptx_file_stream, names_variations_list, redaction_string):
-    prs = Presentation(pptx_file_stream)
-    modified_prs = False
-    for slide in prs.slides:
-        for shape in slide.shapes:
-            if shape.has_text_frame:
-                for para in shape.text_frame.paragraphs:
-                    if redact_text_in_runs(para.runs, names_variations_list, redaction_string): modified_prs = True
-            if shape.has_table:
-                table = shape.table
-                for r_idx in range(len(table.rows)):
-                    for c_idx in range(len(table.columns)):
-                        cell = table.cell(r_idx, c_idx)
-                        if cell.text_frame:
-                            for para in cell.text_frame.paragraphs:
-                                if redact_text_in_runs(para.runs, names_variations_list, redaction_string): modified_prs = True
-        if slide.has_notes_slide and slide.notes_slide.notes_text_frame:
-            for para in slide.notes_slide.notes_text_frame.paragraphs:
-                 if redact_text_in_runs(para.runs, names_variations_list, redaction_string): modified_prs = True
-    if modified_prs:
-        bio = io.BytesIO()
-        prs.save(bio)
-        bio.seek(0)
-        return bio
-    return None
-
-def redact_pdf(pdf_file_stream, names_to_redact_variations, redaction_string): # redaction_string not used for PDF visual
-    pdf_bytes = pdf_file_stream.read()
-    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-    modified_pdf = False
-    
-    # PyMuPDF flags: TEXT_PRESERVE_LIGATURES=1, TEXT_PRESERVE_WHITESPACE=2
-    # search_for is case-insensitive by default in recent versions (>=1.18.0).
-    search_flags = fitz.TEXT_PRESERVE_LIGATURES | fitz.TEXT_PRESERVE_WHITESPACE 
-
-    for page_num in range(len(doc)):
-        page = doc.load_page(page_num)
-        all_rects_to_redact_on_page = [] # Collect all rects for this page
-
-        for name_var in names_to_redact_variations:
-            if not name_var: continue # Should be filtered by generate_name_variations
-
-            try:
-                # search_for returns a list of Rect objects (or Quads if quads=True)
-                text_instances = page.search_for(name_var, flags=search_flags, quads=False) 
-                for inst_rect in text_instances:
-                    if not inst_rect.is_empty and not inst_rect.is_infinite: # Validate rect
-                        all_rects_to_redact_on_page.append(inst_rect)
-            except AttributeError: # Fallback for older PyMuPDF that might not have flags structured the same
-                text_instances = page.search_for(name_var, quads=False) 
-                for inst_rect in text_instances:
-                    if not inst_rect.is_empty and not inst_rect.is_infinite:
-                        all_rects_to_redact_on_page.append(inst_rect)
-            except Exception as e: # Catch other potential search errors
-                st.warning(f"PDF search error for '{name_var}' on page {page_num + 1}: {e}")
-
-        if all_rects_to_redact_on_page:
-            modified_pdf = True 
-            for r in all_rects_to_redact_on_page:
-                try:
-                    page.add_redact_annot(r, text="", fill=(0, 0, 0)) # Add redaction annotation
-                except Exception as annot_e:
-                    # st.warning(f"Could not add PDF redaction annotation for rect {r} on page {page_num+1}: {annot_e}")
-                    pass # Continue if one annotation fails, to not halt all page redaction
-            try:
-                page.apply_redactions(images=fitz.PDF_REDACT_IMAGE_NONE) # Apply all on page
-            except Exception as apply_e:
-                # st.error(f"Error applying PDF redactions on page {page_num+1}: {apply_e}")
-                pass
-    
-    if modified_pdf:
-        bio = io.BytesIO()
-        doc.save(bio, garbage=3, deflate=True, clean=True) # Save efficiently
-        bio.seek(0)
-        doc.close()
-        return bio
-    doc.close()
-    return None
+@st.cache_data(show_spinner=False, max_entries=32)
+def name_variations_for_input(names_input_str_ui):
+    """
+    Parses the UI names string and generates its variations as a tuple, cached on the raw string
+    so repeated clicks with the same names skip the split and variation generation.
+    """
+    return tuple(generate_name_variations(parse_names_from_ui(names_input_str_ui), COMMON_HONORIFICS))
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def build_name_matcher(names_variations_tuple):
+    """Cached create_name_matcher, so repeated clicks with the same names skip the build."""
+    return create_name_matcher(names_variations_tuple)
+
+@st.cache_resource(show_spinner=False)
+def get_redaction_result_cache():
+    return RedactionResultCache(REDACTION_CACHE_MAX_BYTES)
+
+@st.cache_resource(show_spinner=False)
+def get_redaction_executor():
+    """
+    One process pool kept alive across reruns, so workers are not respawned per click and their
+    per-process name matchers (redaction._worker_name_matcher) stay warm for repeated name lists.
+    """
+    return ProcessPoolExecutor(max_workers=POOL_MAX_WORKERS, mp_context=multiprocessing.get_context(POOL_START_METHOD))
+
+def _run_uncached_redaction_tasks(redaction_tasks, task_sizes=None, name_matcher=None):
+    """
+    Runs tasks across the shared process pool; returns a RedactionResult, or the exception raised, per task.
+    A lone DOCX/PPTX task, any task the pool could not take (e.g. it failed to pickle), and every unfinished task
+    when no pool can be started run in-process (using name_matcher). A lone PDF still goes to the pool.
+    A crashed worker breaks the whole pool, failing every task in flight with it: those tasks are rerun one at a time
+    on a fresh pool, and only one that crashes its worker again is reported as an error. None of them is retried
+    in-process, so an input that kills MuPDF cannot take the server process down too.
+    """
+    if not redaction_tasks: return []
+    if len(redaction_tasks) == 1 and redaction_tasks[0][1] != ".pdf": # Not worth the pool round trip, except to keep MuPDF out of this process
+        return [redact_task_or_exception(redaction_tasks[0], name_matcher)]
+    submit_order = range(len(redaction_tasks))
+    if task_sizes is not None: # Longest-first scheduling
+        submit_order = sorted(submit_order, key=lambda i: task_sizes[i], reverse=True)
+    max_workers = min(POOL_MAX_WORKERS, len(redaction_tasks))
+    results = [None] * len(redaction_tasks)
+    unfinished = set(range(len(redaction_tasks)))
+    crashed = [] # Tasks in flight when a worker died; any of them may be the one that killed it
+    in_flight = {}
+    executor = None
+    def submit(i):
+        nonlocal executor
+        try:
+            return executor.submit(redact_task_or_exception, redaction_tasks[i])
+        except BrokenProcessPool: # A worker died (in this job or an earlier one): later tasks go to a fresh pool
+            get_redaction_executor.clear()
+            executor = get_redaction_executor()
+            return executor.submit(redact_task_or_exception, redaction_tasks[i])
+    def collect(done_futures):
+        for future in done_futures:
+            i = in_flight.pop(future)
+            pool_error = future.exception() # Task errors come back as results, so this is the pool's own failure
+            if pool_error is None:
+                results[i] = future.result()
+            elif isinstance(pool_error, BrokenProcessPool): # Reported as is unless its retry below succeeds
+                results[i] = pool_error
+                crashed.append(i)
+            else:
+                continue # Never ran in a worker: left unfinished, so it runs in-process below
+            unfinished.discard(i)
+    try:
+        executor = get_redaction_executor()
+        # Bounded window: only a couple of tasks per worker are queued (with their pickled upload bytes) at a time
+        for i in submit_order:
+            if len(in_flight) >= POOL_TASKS_IN_FLIGHT_PER_WORKER * max_workers:
+                collect(wait(in_flight, return_when=FIRST_COMPLETED)[0])
+            in_flight[submit(i)] = i
+        collect(list(in_flight))
+        # Alone in the pool, a task that crashes its worker again fails by itself
+        for i in sorted(crashed):
+            future = submit(i)
+            pool_error = future.exception()
+            results[i] = future.result() if pool_error is None else pool_error
+    except (OSError, NotImplementedError, RuntimeError): # e.g. sandboxed hosts without working multiprocessing
+        collect(list(in_flight))
+    for i in sorted(unfinished):
+        results[i] = redact_task_or_exception(redaction_tasks[i], name_matcher)
+    return results
+
+def known_file_extension(file_name):
+    """Lower-case extension of file_name if it is one of KNOWN_FILE_EXTENSIONS, else "" (one lower() and a few endswith checks)."""
+    file_name = file_name.lower()
+    for file_extension in KNOWN_FILE_EXTENSIONS:
+        if file_name.endswith(file_extension): return file_extension
+    return ""
+
+def copy_stream_into_zip(zip_archive, arcname, source_stream):
+    """
+    Streams source_stream into a new member of zip_archive in fixed-size chunks, never holding it whole in memory.
+    Stored, not deflated: every output member is a DOCX/PPTX (already a ZIP) or a PDF with deflated streams.
+    """
+    member_info = zipfile.ZipInfo(arcname, date_time=time.localtime(time.time())[:6])
+    member_info.compress_type = zipfile.ZIP_STORED
+    member_info.external_attr = 0o600 << 16 # Same permissions writestr gives a member added by name
+    with zip_archive.open(member_info, 'w') as member_stream:
+        shutil.copyfileobj(source_stream, member_stream, ZIP_MEMBER_BUFFER_SIZE)
+
+def unique_arcname(arcname, used_arcnames):
+    """
+    Returns arcname, or "name (2).ext", "name (3).ext", ... if it is already in used_arcnames, and records the result there.
+    Keeps two uploads with the same file name from becoming duplicate members of one output ZIP.
+    """
+    name_base, file_extension = os.path.splitext(arcname)
+    candidate, suffix_index = arcname, 1
+    while candidate.lower() in used_arcnames: # Case-insensitive, as on the filesystems most archives get extracted to
+        suffix_index += 1
+        candidate = f"{name_base} ({suffix_index}){file_extension}"
+    used_arcnames.add(candidate.lower())
+    return candidate
 
 def extract_initials_from_filename(filename_base):
     """Attempts to extract 2 initials from a filename base."""
@@ -232,7 +230,7 @@ def extract_initials_from_filename(filename_base):
     name_part = os.path.splitext(filename_base)[0]
     
     # Split by common delimiters: space, hyphen, underscore
-    parts = re.split(r'[\s_-]+', name_part)
+    parts = FILENAME_PART_SPLIT_RE.split(name_part)
     parts = [p for p in parts if p and p[0].isalpha()] # Keep only parts starting with a letter
 
     initials = ""
@@ -247,209 +245,279 @@ def extract_initials_from_filename(filename_base):
 
 
 # --- Streamlit App UI and Main Logic ---
-st.set_page_config(layout="wide", page_title="TU Name Redactor", page_icon="🐉")
-
-st.markdown("""
-<style>
-    .stButton>button[kind="primary"] { 
-        background-color: #4CAF50 !important; color: white !important; border: none !important;
-    }
-    .stButton>button[kind="primary"]:hover {
-        background-color: #45a049 !important; color: white !important;
-    }
-    .stButton>button[kind="primary"]:active {
-        background-color: #3e8e41 !important; color: white !important;
-    }
-</style>
-""", unsafe_allow_html=True)
-
-st.title("🐉 TU Name Redactor")
-st.markdown("Welcome! This tool redacts names from documents. Configure settings, upload files, and download.")
-st.markdown("---")
-
-with st.sidebar:
-    st.header("⚙️ Redaction Settings")
-    names_input_str_ui = st.text_area( 
-        "Names to redact (comma-separated):", 
-        placeholder="e.g., Professor Plum, John K. Doe, Ms. Scarlet, Young",
-        height=120, 
-        help="Enter full names, names with honorifics, or last names. The app will generate variations."
-    )
-    redaction_text_docx_pptx = st.text_input(
-        "Redaction text for DOCX/PPTX:", value="[REDACTED]",
-        help="Text replacement for Word/PowerPoint. PDFs are blacked out.")
+def main():
+    """Renders the app and runs a redaction job when "Redact Files" is clicked."""
+    st.set_page_config(layout="wide", page_title="TU Name Redactor", page_icon="🐉")
+
+    st.markdown("""
+    <style>
+        .stButton>button[kind="primary"] { 
+            background-color: #4CAF50 !important; color: white !important; border: none !important;
+        }
+        .stButton>button[kind="primary"]:hover {
+            background-color: #45a049 !important; color: white !important;
+        }
+        .stButton>button[kind="primary"]:active {
+            background-color: #3e8e41 !important; color: white !important;
+        }
+    </style>
+    """, unsafe_allow_html=True)
+
+    st.title("🐉 TU Name Redactor")
+    st.markdown("Welcome! This tool redacts names from documents. Configure settings, upload files, and download.")
     st.markdown("---")
-    st.subheader("📦 ZIP Output Options")
-    st.caption("(These options apply *only* when processing an uploaded ZIP file)")
-    output_zip_name_user_input = st.text_input(
-        "Custom output ZIP name base:", 
-        placeholder="e.g., MyProject_Redacted",
-        help="Base name for the output ZIP. Defaults to 'redacted_[original_zip_name]'. '.zip' added automatically."
-    )
-    st.caption("Initials for files within the ZIP are auto-extracted from their original filenames (if possible, max 2 initials).")
-
-uploaded_files = st.file_uploader(
-    "Upload .docx, .pptx, .pdf, or .zip files", type=["docx", "pptx", "pdf", "zip"],
-    accept_multiple_files=True, help="Upload individual files or ZIP archives.")
-
-if st.button("Redact Files", type="primary", use_container_width=True, key="redact_button"):
-    if not uploaded_files: st.warning("⚠️ Please upload at least one file.")
-    elif not names_input_str_ui.strip(): st.warning("⚠️ Please enter at least one name to redact.")
-    else:
-        # 1. Get raw names from UI
-        parsed_user_names = parse_names_from_ui(names_input_str_ui)
-        # 2. Generate variations
-        names_variations_list = generate_name_variations(parsed_user_names, COMMON_HONORIFICS)
-        
-        if not names_variations_list:
-            st.warning("⚠️ No valid names or variations generated for redaction. Please check your input.")
+
+    with st.sidebar:
+        st.header("⚙️ Redaction Settings")
+        names_input_str_ui = st.text_area( 
+            "Names to redact (comma-separated):", 
+            placeholder="e.g., Professor Plum, John K. Doe, Ms. Scarlet, Young",
+            height=120, 
+            help="Enter full names, names with honorifics, or last names. The app will generate variations."
+        )
+        redaction_text_docx_pptx = st.text_input(
+            "Redaction text for DOCX/PPTX:", value="[REDACTED]",
+            help="Text replacement for Word/PowerPoint. PDFs are blacked out.")
+        clean_pdf_output = st.checkbox(
+            "Deep-clean redacted PDFs (slower)", value=False,
+            help="Rewrites and sanitizes every PDF content stream when saving. Can shrink output further but is slow on complex PDFs.")
+        st.markdown("---")
+        st.subheader("📦 ZIP Output Options")
+        st.caption("(These options apply *only* when processing an uploaded ZIP file)")
+        output_zip_name_user_input = st.text_input(
+            "Custom output ZIP name base:", 
+            placeholder="e.g., MyProject_Redacted",
+            help="Base name for the output ZIP. Defaults to 'redacted_[original_zip_name]'. '.zip' added automatically."
+        )
+        st.caption("Initials for files within the ZIP are auto-extracted from their original filenames (if possible, max 2 initials).")
+
+    uploaded_files = st.file_uploader(
+        "Upload .docx, .pptx, .pdf, or .zip files", type=["docx", "pptx", "pdf", "zip"],
+        accept_multiple_files=True, help="Upload individual files or ZIP archives.")
+
+    if st.button("Redact Files", type="primary", use_container_width=True, key="redact_button"):
+        if not uploaded_files: st.warning("⚠️ Please upload at least one file.")
+        elif not names_input_str_ui.strip(): st.warning("⚠️ Please enter at least one name to redact.")
         else:
-            st.info(f"Attempting to redact based on {len(names_variations_list)} name variations (e.g., {', '.join(names_variations_list[:min(3, len(names_variations_list))])}...).")
-            st.info(f"DOCX/PPTX redaction: '{redaction_text_docx_pptx}'. PDFs blacked out.")
-            
-            overall_docs_modified_count = 0
-            files_for_download = [] 
-
-            with st.spinner("🔧 Processing files... This might take a moment..."):
-                for uploaded_file_obj in uploaded_files:
-                    original_input_name = uploaded_file_obj.name
-                    file_extension = os.path.splitext(original_input_name)[1].lower()
-                    
-                    if file_extension == ".zip":
-                        st.write(f"--- Processing ZIP: **{original_input_name}** ---")
-                        processed_zip_members_data = [] 
-                        members_found_for_processing_in_zip = False
-                        custom_zip_name_base_from_input = output_zip_name_user_input.strip()
-                        actual_output_zip_base_name = custom_zip_name_base_from_input if custom_zip_name_base_from_input \
-                                                      else f"redacted_{os.path.splitext(original_input_name)[0]}"
-                        try:
-                            with zipfile.ZipFile(uploaded_file_obj, 'r') as zip_ref:
-                                for member_name_in_zip in zip_ref.namelist():
-                                    # Get only the filename part for extension check and base name extraction
-                                    member_filename_only = os.path.basename(member_name_in_zip)
-                                    member_base_name, member_ext_zip_ext = os.path.splitext(member_filename_only)
-                                    
-                                    if member_name_in_zip.endswith('/') or member_name_in_zip.startswith('__MACOSX'): continue
-                                    
-                                    if member_ext_zip_ext.lower() in [".docx", ".pptx", ".pdf"]:
-                                        members_found_for_processing_in_zip = True
-                                        st.caption(f"  Processing member: {member_name_in_zip}")
-                                        member_bytes = zip_ref.read(member_name_in_zip)
-                                        member_stream = io.BytesIO(member_bytes)
-                                        redacted_member_content = None
-                                        
-                                        if member_ext_zip_ext.lower() == ".docx": redacted_member_content = redact_docx(member_stream, names_variations_list, redaction_text_docx_pptx)
-                                        elif member_ext_zip_ext.lower() == ".pptx": redacted_member_content = redact_pptx(member_stream, names_variations_list, redaction_text_docx_pptx)
-                                        elif member_ext_zip_ext.lower() == ".pdf": redacted_member_content = redact_pdf(member_stream, names_variations_list, redaction_text_docx_pptx)
-                                        
-                                        if redacted_member_content:
-                                            processed_zip_members_data.append((member_name_in_zip, redacted_member_content)) # Store full original path for structure
-                                            st.success(f"    ✅ Redacted: {member_filename_only}")
-                                            overall_docs_modified_count += 1
-                                        else: 
-                                            member_stream.seek(0)
-                                            processed_zip_members_data.append((member_name_in_zip, member_stream))
-                                            st.info(f"    ℹ️ No redactions in: {member_filename_only} (original included)")
-                            
-                            if members_found_for_processing_in_zip and processed_zip_members_data:
-                                output_zip_stream = io.BytesIO()
-                                file_counter_in_zip = 1
-                                with zipfile.ZipFile(output_zip_stream, 'w', zipfile.ZIP_DEFLATED) as new_zip_archive:
-                                    for m_full_path_in_zip, m_stream_content in processed_zip_members_data:
-                                        m_stream_content.seek(0)
-                                        
-                                        original_member_filename_only = os.path.basename(m_full_path_in_zip)
-                                        original_member_base_filename_only, original_member_ext_only = os.path.splitext(original_member_filename_only)
-                                        
-                                        extracted_initials = extract_initials_from_filename(original_member_base_filename_only)
-                                        
-                                        if extracted_initials: 
-                                            new_filename_for_zip_entry_base = f"{actual_output_zip_base_name}_{extracted_initials}_{file_counter_in_zip:04d}"
-                                        else: 
-                                            new_filename_for_zip_entry_base = f"{actual_output_zip_base_name}_{file_counter_in_zip:04d}"
-                                        
-                                        new_filename_for_zip_entry = f"{new_filename_for_zip_entry_base}{original_member_ext_only}"
-                                        
-                                        # This ensures files are at the top level of the output ZIP
-                                        new_zip_archive.writestr(new_filename_for_zip_entry, m_stream_content.read())
-                                        file_counter_in_zip +=1
-                                
-                                output_zip_stream.seek(0)
-                                display_zip_name = f"{actual_output_zip_base_name}.zip"
-                                files_for_download.append((original_input_name, display_zip_name, output_zip_stream, ".zip"))
-                                st.success(f"📦 Created new ZIP: **{display_zip_name}**.")
-                                st.caption(f"   Files inside '{display_zip_name}' are at the top level, renamed using base '{actual_output_zip_base_name}', auto-extracted initials (if any), and a number.")
-
-                            elif not members_found_for_processing_in_zip: 
-                                st.info(f"ℹ️ No supported files (.docx, .pptx, .pdf) found in ZIP: **{original_input_name}** to process.")
-                        except zipfile.BadZipFile: st.error(f"❌ Error: ZIP '{original_input_name}' appears to be corrupted.")
-                        except Exception as e: st.error(f"❌ Error processing ZIP '{original_input_name}': {e}")
-                    
-                    else: # Process individual (non-ZIP) files
-                        uploaded_file_obj.seek(0)
-                        st.write(f"--- Processing: **{original_input_name}** ---")
-                        redacted_content = None
-                        try:
-                            if file_extension == ".docx": redacted_content = redact_docx(uploaded_file_obj, names_variations_list, redaction_text_docx_pptx)
-                            elif file_extension == ".pptx": redacted_content = redact_pptx(uploaded_file_obj, names_variations_list, redaction_text_docx_pptx)
-                            elif file_extension == ".pdf": redacted_content = redact_pdf(uploaded_file_obj, names_variations_list, redaction_text_docx_pptx)
-                            
-                            if redacted_content:
-                                display_name = f"redacted_{original_input_name}"
-                                files_for_download.append((original_input_name, display_name, redacted_content, file_extension))
-                                st.success(f"✅ Successfully redacted: **{original_input_name}**")
-                                overall_docs_modified_count += 1
-                            else:
-                                st.info(f"ℹ️ No redactions made in **{original_input_name}** (file unchanged).")
-                                uploaded_file_obj.seek(0) 
-                                display_name = f"original_{original_input_name}"
-                                files_for_download.append((original_input_name, display_name, uploaded_file_obj, file_extension))
-                        except Exception as e: st.error(f"❌ Error processing **{original_input_name}**: {e}")
-
-            if files_for_download:
-                st.markdown("---"); st.subheader("⬇️ Download Files")
-                num_files = len(files_for_download)
-                max_cols = 3 
-                num_cols_to_use = min(num_files, max_cols) if num_files > 0 else 1
-                cols = st.columns(num_cols_to_use)
-                for i, (orig_name, display_name, data_stream, ext) in enumerate(files_for_download):
-                    mime_types = { ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                                   ".pptx": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
-                                   ".pdf": "application/pdf", ".zip": "application/zip"}
-                    mime_type = mime_types.get(ext, "application/octet-stream")
-                    data_stream.seek(0) 
-                    col_index = i % num_cols_to_use
-                    with cols[col_index]:
+            # 1-2. Parse the raw names from the UI and generate variations (cached per input string)
+            names_variations_tuple = name_variations_for_input(names_input_str_ui)
+
+            if not names_variations_tuple:
+                st.warning("⚠️ No valid names or variations generated for redaction. Please check your input.")
+            else:
+                st.info(f"Attempting to redact based on {len(names_variations_tuple)} name variations (e.g., {', '.join(names_variations_tuple[:min(3, len(names_variations_tuple))])}...).")
+                st.info(f"DOCX/PPTX redaction: '{redaction_text_docx_pptx}'. PDFs blacked out.")
+                # 3. Build (or reuse the cached) matcher once for the whole job
+                name_matcher = build_name_matcher(names_variations_tuple)
+
+                overall_docs_modified_count = 0
+                files_for_download = [] 
+                processing_log = [] # Markdown lines, rendered once after processing rather than one element per file
+
+                with st.spinner("🔧 Processing files... This might take a moment..."):
+                    # 4. Expand uploads (and supported ZIP members) into independent, picklable redaction tasks
+                    redaction_tasks = [] # (task_source, file_extension, names_variations_tuple, redaction_string, clean_pdf_output)
+                    redaction_task_sizes = [] # Uncompressed input size per task, so the pool can start the largest files first
+                    redaction_content_keys = [] # Input key per task for the result cache (None: hashed when the cache is consulted)
+                    upload_plans = [] # (uploaded_file_obj, file_extension, task index or list of (member_name_in_zip, task index))
+                    spooled_zip_paths = [] # ZIPs are spooled to disk once so workers stream only their own member
+                    # (CRC-32, size) of every top-level document, so ZIP members that may be copies of one are hashed by content
+                    top_level_crc_sizes = set()
+                    for uploaded_file_obj in uploaded_files:
+                        if known_file_extension(uploaded_file_obj.name) in SUPPORTED_DOCUMENT_EXTENSIONS:
+                            top_level_crc_sizes.add(upload_crc_size(uploaded_file_obj.getvalue()))
+                    for uploaded_file_obj in uploaded_files:
+                        original_input_name = uploaded_file_obj.name
+                        file_extension = known_file_extension(original_input_name)
+
+                        if file_extension == ".zip":
+                            zip_member_tasks = []
+                            try:
+                                archive_digest = hashlib.sha256()
+                                with tempfile.NamedTemporaryFile(suffix=".zip", delete=False) as spooled_zip:
+                                    spooled_zip_paths.append(spooled_zip.name)
+                                    uploaded_file_obj.seek(0)
+                                    # Hashed while spooled, so member cache keys need no decompression
+                                    for chunk in iter(functools.partial(uploaded_file_obj.read, 1 << 20), b""):
+                                        archive_digest.update(chunk)
+                                        spooled_zip.write(chunk)
+                                archive_digest = archive_digest.digest()
+                                with zipfile.ZipFile(spooled_zip.name, 'r') as zip_ref:
+                                    member_infos = []
+                                    for member_info in zip_ref.infolist():
+                                        member_name_in_zip = member_info.filename
+                                        # Metadata only: directories and empty members are skipped without opening anything
+                                        if member_info.is_dir() or member_info.file_size == 0 or ZIP_SKIP_MEMBER_RE.match(member_name_in_zip): continue
+                                        member_ext_zip_ext = known_file_extension(member_name_in_zip)
+                                        if member_ext_zip_ext not in SUPPORTED_DOCUMENT_EXTENSIONS: continue
+                                        member_infos.append((member_info, member_ext_zip_ext))
+                                    # Keyed without decompression, except likely copies of another member or of a top-level upload
+                                    member_content_keys = zip_member_content_keys(
+                                        zip_ref, [member_info for member_info, _ in member_infos], archive_digest, top_level_crc_sizes)
+                                    for (member_info, member_ext_zip_ext), member_content_key in zip(member_infos, member_content_keys):
+                                        member_name_in_zip = member_info.filename
+                                        zip_member_tasks.append((member_name_in_zip, len(redaction_tasks)))
+                                        redaction_tasks.append(((spooled_zip.name, member_name_in_zip), member_ext_zip_ext, names_variations_tuple, redaction_text_docx_pptx, clean_pdf_output))
+                                        redaction_task_sizes.append(member_info.file_size)
+                                        redaction_content_keys.append(member_content_key)
+                                upload_plans.append((uploaded_file_obj, file_extension, zip_member_tasks))
+                            except zipfile.BadZipFile: st.error(f"❌ Error: ZIP '{original_input_name}' appears to be corrupted.")
+                            except Exception as e: st.error(f"❌ Error processing ZIP '{original_input_name}': {e}")
+                        else:
+                            upload_plans.append((uploaded_file_obj, file_extension, len(redaction_tasks)))
+                            uploaded_file_bytes = uploaded_file_obj.getvalue()
+                            redaction_tasks.append((uploaded_file_bytes, file_extension, names_variations_tuple, redaction_text_docx_pptx, clean_pdf_output))
+                            redaction_task_sizes.append(len(uploaded_file_bytes))
+                            redaction_content_keys.append(None)
+
+                    try:
+                        # 5. Redact every file in parallel
+                        run_uncached_tasks = functools.partial(_run_uncached_redaction_tasks, name_matcher=name_matcher)
+                        redaction_results = run_redaction_tasks(redaction_tasks, run_uncached_tasks, get_redaction_result_cache(), redaction_task_sizes, redaction_content_keys)
+
+                        # 6. Report and assemble downloads in upload order
+                        for uploaded_file_obj, file_extension, upload_plan in upload_plans:
+                            original_input_name = uploaded_file_obj.name
+
+                            if file_extension == ".zip":
+                                processing_log.append(f"- **{original_input_name}** (ZIP)")
+                                custom_zip_name_base_from_input = output_zip_name_user_input.strip()
+                                actual_output_zip_base_name = custom_zip_name_base_from_input if custom_zip_name_base_from_input \
+                                                              else f"redacted_{os.path.splitext(original_input_name)[0]}"
+                                try:
+                                    if upload_plan:
+                                        # Members are written straight into the output ZIP; unmodified ones are streamed
+                                        # from the spooled upload instead of being buffered first
+                                        output_zip_stream = new_output_buffer()
+                                        with zipfile.ZipFile(output_zip_stream, 'w', zipfile.ZIP_STORED) as new_zip_archive:
+                                            for file_counter_in_zip, (member_name_in_zip, task_index) in enumerate(upload_plan, start=1):
+                                                member_filename_only = os.path.basename(member_name_in_zip)
+                                                redacted_member_content = redaction_results[task_index]
+                                                if isinstance(redacted_member_content, Exception): raise redacted_member_content
+
+                                                original_member_base_filename_only, original_member_ext_only = os.path.splitext(member_filename_only)
+
+                                                extracted_initials = extract_initials_from_filename(original_member_base_filename_only)
+
+                                                if extracted_initials: 
+                                                    new_filename_for_zip_entry_base = f"{actual_output_zip_base_name}_{extracted_initials}_{file_counter_in_zip:04d}"
+                                                else: 
+                                                    new_filename_for_zip_entry_base = f"{actual_output_zip_base_name}_{file_counter_in_zip:04d}"
+
+                                                # This ensures files are at the top level of the output ZIP
+                                                new_filename_for_zip_entry = f"{new_filename_for_zip_entry_base}{original_member_ext_only}"
+
+                                                if redacted_member_content:
+                                                    new_zip_archive.writestr(new_filename_for_zip_entry, redacted_member_content)
+                                                    processing_log.append(f"    - ✅ Redacted: {member_filename_only}")
+                                                    overall_docs_modified_count += 1
+                                                else: 
+                                                    with open_task_source(redaction_tasks[task_index][0]) as original_member_stream:
+                                                        copy_stream_into_zip(new_zip_archive, new_filename_for_zip_entry, original_member_stream)
+                                                    processing_log.append(f"    - ℹ️ No redactions in: {member_filename_only} (original included)")
+                                                # Written out: drop this member's result and source so only one is held at a time
+                                                redaction_results[task_index] = redaction_tasks[task_index] = None
+
+                                        output_zip_stream.seek(0)
+                                        display_zip_name = f"{actual_output_zip_base_name}.zip"
+                                        files_for_download.append((original_input_name, display_zip_name, output_zip_stream, ".zip"))
+                                        processing_log.append(f"    - 📦 Created new ZIP: **{display_zip_name}**. Files inside are at the top level, renamed using base '{actual_output_zip_base_name}', auto-extracted initials (if any), and a number.")
+
+                                    else: 
+                                        processing_log.append("    - ℹ️ No supported files (.docx, .pptx, .pdf) found to process.")
+                                except Exception as e: st.error(f"❌ Error processing ZIP '{original_input_name}': {e}")
+
+                            else: # Individual (non-ZIP) files
+                                redacted_content = redaction_results[upload_plan]
+                                redaction_results[upload_plan] = redaction_tasks[upload_plan] = None # The download below keeps its own reference
+                                if isinstance(redacted_content, Exception):
+                                    st.error(f"❌ Error processing **{original_input_name}**: {redacted_content}")
+                                elif redacted_content:
+                                    display_name = f"redacted_{original_input_name}"
+                                    files_for_download.append((original_input_name, display_name, io.BytesIO(redacted_content), file_extension))
+                                    processing_log.append(f"- ✅ Successfully redacted: **{original_input_name}**")
+                                    overall_docs_modified_count += 1
+                                else:
+                                    processing_log.append(f"- ℹ️ No redactions made in **{original_input_name}** (file unchanged).")
+                                    uploaded_file_obj.seek(0) 
+                                    display_name = f"original_{original_input_name}"
+                                    files_for_download.append((original_input_name, display_name, uploaded_file_obj, file_extension))
+                    finally:
+                        redaction_tasks = redaction_results = None # Uploaded inputs and results are not needed past this point
+                        for spooled_zip_path in spooled_zip_paths:
+                            with contextlib.suppress(OSError): os.remove(spooled_zip_path)
+
+                if processing_log:
+                    # Collapsed for big batches (e.g. ZIPs with hundreds of members) so the downloads stay in view
+                    with st.expander("📋 Processing log", expanded=len(processing_log) <= PROCESSING_LOG_EXPANDED_MAX_LINES):
+                        st.markdown("\n".join(processing_log))
+
+                if files_for_download:
+                    st.markdown("---"); st.subheader("⬇️ Download Files")
+                    num_files = len(files_for_download)
+                    max_cols = 3 
+                    num_cols_to_use = min(num_files, max_cols) if num_files > 0 else 1
+                    cols = st.columns(num_cols_to_use)
+                    # Every output is already compressed (OOXML, deflated PDF streams, ZIPs), so the bundle stores them as-is.
+                    # Each output is added to it right after its own button, then closed, so spooled temp files go away early.
+                    combined_zip_stream = new_output_buffer() if num_files > 1 else None
+                    combined_zip_archive = zipfile.ZipFile(combined_zip_stream, 'w', zipfile.ZIP_STORED) if combined_zip_stream else None
+                    combined_zip_arcnames = set()
+                    for i, (orig_name, display_name, data_stream, ext) in enumerate(files_for_download):
+                        mime_types = { ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+                                       ".pptx": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+                                       ".pdf": "application/pdf", ".zip": "application/zip"}
+                        mime_type = mime_types.get(ext, "application/octet-stream")
+                        data_stream.seek(0) 
+                        col_index = i % num_cols_to_use
+                        with cols[col_index]:
+                            st.download_button(
+                                label=f"Download {display_name}", data=data_stream.read(), # Spooled files are not accepted as-is
+                                file_name=display_name, mime=mime_type,
+                                key=f"dl_btn_{i}_{display_name.replace(' ','_').replace('.','_').replace('/','_')}"
+                            )
+                        if combined_zip_archive:
+                            data_stream.seek(0)
+                            copy_stream_into_zip(combined_zip_archive, unique_arcname(display_name, combined_zip_arcnames), data_stream)
+                        data_stream.close()
+                    files_for_download.clear()
+                    if combined_zip_archive:
+                        combined_zip_archive.close()
+                        combined_zip_stream.seek(0)
                         st.download_button(
-                            label=f"Download {display_name}", data=data_stream,
-                            file_name=display_name, mime=mime_type,
-                            key=f"dl_btn_{i}_{display_name.replace(' ','_').replace('.','_').replace('/','_')}"
+                            label="Download all as ZIP", data=combined_zip_stream.read(),
+                            file_name="redacted_files.zip", mime="application/zip",
+                            key="dl_btn_all_zip", use_container_width=True
                         )
-            
-            if overall_docs_modified_count == 0 and uploaded_files:
-                st.info("ℹ️ No documents were modified based on the provided names, or no supported files were found in ZIPs.")
-            elif overall_docs_modified_count > 0:
-                st.balloons()
-
-st.markdown("---")
-with st.expander("📜 Instructions & Notes", expanded=False):
-    st.markdown("""
-        #### How to Use:
-        1.  **Configure Settings (Sidebar):**
-            *   Enter **Names to redact**: Provide a comma-separated list (e.g., `Professor Plum, John K. Doe, Ms. Scarlet, Young`). The app automatically generates variations (like `Plum` from `Professor Plum`, or `Mr. Young`, `Dr. Young` from `Young`) to improve detection.
-            *   Set custom **Redaction text** for DOCX/PPTX files if desired.
-            *   Optionally, for **ZIP Output Options** (these apply *only* when you upload a .zip file):
-                *   **Custom output ZIP name base:** If you input `MyProject`, an uploaded `data.zip` will result in `MyProject.zip`. If left blank, it defaults to `redacted_data.zip`.
-                *   Initials for renaming files *inside* the ZIP are automatically extracted from the original filenames of the member files (e.g., a file named `John-Doe-Report.docx` might contribute `JD` as initials). Max 2 initials.
-        2.  **Upload Files (Main Area):** Select one or more .docx, .pptx, .pdf, or .zip files.
-        3.  **Redact:** Click the "Redact Files" button.
-        4.  **Download:**
-            *   Processed individual files (or original if no changes) will be available for download.
-            *   If you uploaded a ZIP file, a **new ZIP archive** will be created with the (potentially custom) name. All processed files from the original ZIP will be placed at the **top level** of this new ZIP, renamed as: `[OutputZipNameBase]_[ExtractedInitials]_[Number].ext`. If initials cannot be extracted, that part is omitted.
-
-        #### Important Notes:
-        *   **PDF Redaction:** Names in PDF files are "blacked out." The custom redaction text does not apply to PDF visual output.
-        *   **ZIP File Processing:** Files within the original ZIP that are not .docx, .pptx, or .pdf are currently **not** included in the output ZIP.
-        *   **Complex Documents:** For very complex layouts, embedded objects, or scanned (image-based) PDFs without OCR text, redaction might be incomplete. This tool works best with text-based documents. The redaction in DOCX/PPTX happens segment-by-segment (run-by-run), so names split across different formatting segments might not be fully caught if the individual parts don't match a variation.
-        *   **Backup:** Always keep a backup of your original files before redacting!
-        """)
+
+                if overall_docs_modified_count == 0 and uploaded_files:
+                    st.info("ℹ️ No documents were modified based on the provided names, or no supported files were found in ZIPs.")
+                elif overall_docs_modified_count > 0:
+                    st.balloons()
+
+    st.markdown("---")
+    with st.expander("📜 Instructions & Notes", expanded=False):
+        st.markdown("""
+            #### How to Use:
+            1.  **Configure Settings (Sidebar):**
+                *   Enter **Names to redact**: Provide a comma-separated list (e.g., `Professor Plum, John K. Doe, Ms. Scarlet, Young`). The app automatically generates variations (like `Plum` from `Professor Plum`, or `Mr. Young`, `Dr. Young` from `Young`) to improve detection.
+                *   Set custom **Redaction text** for DOCX/PPTX files if desired.
+                *   Optionally, for **ZIP Output Options** (these apply *only* when you upload a .zip file):
+                    *   **Custom output ZIP name base:** If you input `MyProject`, an uploaded `data.zip` will result in `MyProject.zip`. If left blank, it defaults to `redacted_data.zip`.
+                    *   Initials for renaming files *inside* the ZIP are automatically extracted from the original filenames of the member files (e.g., a file named `John-Doe-Report.docx` might contribute `JD` as initials). Max 2 initials.
+            2.  **Upload Files (Main Area):** Select one or more .docx, .pptx, .pdf, or .zip files.
+            3.  **Redact:** Click the "Redact Files" button.
+            4.  **Download:**
+                *   Processed individual files (or original if no changes) will be available for download.
+                *   If you uploaded a ZIP file, a **new ZIP archive** will be created with the (potentially custom) name. All processed files from the original ZIP will be placed at the **top level** of this new ZIP, renamed as: `[OutputZipNameBase]_[ExtractedInitials]_[Number].ext`. If initials cannot be extracted, that part is omitted.
+
+            #### Important Notes:
+            *   **PDF Redaction:** Names in PDF files are "blacked out." The custom redaction text does not apply to PDF visual output. Only the name's characters are blacked out; punctuation next to it (e.g. `(Doe,`) is kept. Like DOCX/PPTX, PDFs match whole words only: a name run together with other letters or digits (e.g. `JohnDoe`, `jdoe@example.com`, `Doeville`) is **not** blacked out.
+            *   **ZIP File Processing:** Files within the original ZIP that are not .docx, .pptx, or .pdf are currently **not** included in the output ZIP.
+            *   **Complex Documents:** For very complex layouts, embedded objects, or scanned (image-based) PDFs without OCR text, redaction might be incomplete. This tool works best with text-based documents. In DOCX/PPTX each paragraph is matched as a whole, so names split across different formatting segments are still caught; the redaction text takes the formatting of the segment where the name starts.
+            *   **DOCX Comments & Tracked Changes:** Names are redacted in footnotes, endnotes, comments and tracked deletions too. A comment or tracked-change author containing a name is replaced (with its initials) by the redaction text. Document properties (e.g. the file's author and "last modified by" fields) are **not** changed.
+            *   **Backup:** Always keep a backup of your original files before redacting!
+            """)
+
+if __name__ == "__main__": # Streamlit runs the script as __main__; pool workers importing it must not render the UI
+    main()
@@ -0,0 +1,138 @@
+"""
+Result cache for redaction jobs: content keys for uploads and ZIP members, the byte-bounded LRU of redacted outputs,
+and the cached/deduplicated dispatch of a job's tasks. Kept out of the Streamlit script so it can be imported and tested.
+"""
+from redaction import open_task_source
+import zlib
+import functools
+import hashlib
+import threading
+from collections import OrderedDict
+
+REDACTION_CACHE_ENTRY_OVERHEAD_BYTES = 1024 # Charged per entry on top of its output, so many "no redactions" entries stay bounded too
+
+class RedactionResultCache:
+    """
+    Thread-safe LRU of redaction outputs (bytes or None), shared by all sessions through st.cache_resource.
+    Bounded by the total size of the outputs it holds; an output larger than the whole budget is not kept.
+    """
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _entry_size(value):
+        return REDACTION_CACHE_ENTRY_OVERHEAD_BYTES + (len(value) if value is not None else 0)
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries: return default
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key, value):
+        value_size = self._entry_size(value)
+        if value_size > self.max_bytes: return
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._entry_size(self._entries.pop(key))
+            self._entries[key] = value
+            self._total_bytes += value_size
+            while self._total_bytes > self.max_bytes:
+                self._total_bytes -= self._entry_size(self._entries.popitem(last=False)[1])
+
+def content_sha256(file_stream):
+    """SHA-256 digest of everything left in file_stream, read in chunks rather than buffered whole."""
+    content_digest = hashlib.sha256()
+    for chunk in iter(functools.partial(file_stream.read, 1 << 20), b""):
+        content_digest.update(chunk)
+    return content_digest.digest()
+
+def upload_crc_size(content):
+    """(CRC-32, size) of an upload's bytes, comparable with a ZIP member's (ZipInfo.CRC, ZipInfo.file_size)."""
+    return (zlib.crc32(content), len(content))
+
+def zip_member_content_keys(zip_ref, member_infos, archive_digest, top_level_crc_sizes=frozenset()):
+    """
+    Input keys for redaction_cache_key, one per member in member_infos. Members are keyed by (archive digest, name),
+    with no decompression. Only those sharing a CRC and size with another member or with a top-level upload
+    (top_level_crc_sizes, see upload_crc_size), i.e. likely copies of one file, are hashed by content
+    so each copy is redacted once.
+    """
+    crc_size_counts = {}
+    for member_info in member_infos:
+        crc_size = (member_info.CRC, member_info.file_size)
+        crc_size_counts[crc_size] = crc_size_counts.get(crc_size, 0) + 1
+    content_keys = []
+    for member_info in member_infos:
+        crc_size = (member_info.CRC, member_info.file_size)
+        if crc_size_counts[crc_size] > 1 or crc_size in top_level_crc_sizes:
+            with zip_ref.open(member_info) as member_stream:
+                content_keys.append(content_sha256(member_stream))
+        else:
+            content_keys.append((archive_digest, member_info.filename))
+    return content_keys
+
+def redaction_cache_key(task, content_key=None):
+    """
+    Keys a task by its input content plus everything that shapes the output. content_key identifies the input
+    (e.g. as computed while its upload was spooled); without one, the input is hashed here.
+    """
+    if content_key is None:
+        with open_task_source(task[0]) as file_stream:
+            content_key = content_sha256(file_stream)
+    cache_key = (content_key,) + task[1:]
+    # PDFs are blacked out and never use the redaction text, so one result serves every redaction text
+    if task[1] == ".pdf": return unchanged_result_cache_key(cache_key)
+    # Likewise, the deep-clean setting only applies to PDFs, so toggling it keeps DOCX/PPTX results
+    return cache_key[:4] + (None,)
+
+def unchanged_result_cache_key(cache_key):
+    """
+    Key for a "no names found" result. It holds whatever the redaction text is, so that field is blanked:
+    after only changing the redaction text, files already known to contain no names are not parsed again.
+    """
+    return cache_key[:3] + (None,) + cache_key[4:]
+
+def run_redaction_tasks(redaction_tasks, run_uncached_tasks, result_cache=None, task_sizes=None, content_keys=None):
+    """
+    Redacts independent files with run_uncached_tasks(tasks, task_sizes), which returns a RedactionResult,
+    or the exception raised, per task (e.g. across a process pool).
+    Returns one result per task, in task order: redacted bytes, None (no redactions), or the exception the task raised.
+    With a result_cache, previously redacted identical inputs are answered from it and only misses are dispatched,
+    each distinct input once. content_keys, if given, are the tasks' input keys for redaction_cache_key
+    (None entries are hashed there).
+    With task_sizes, the largest tasks are submitted first so a big file doesn't start last and hold up the batch.
+    """
+    if result_cache is None:
+        return [result if isinstance(result, Exception) else result.content
+                for result in run_uncached_tasks(redaction_tasks, task_sizes)]
+    cache_misses = object()
+    if content_keys is None: content_keys = [None] * len(redaction_tasks)
+    cache_keys = [redaction_cache_key(task, content_key) for task, content_key in zip(redaction_tasks, content_keys)]
+    results = [result_cache.get(cache_key, cache_misses) for cache_key in cache_keys]
+    for i, result in enumerate(results):
+        if result is cache_misses:
+            results[i] = result_cache.get(unchanged_result_cache_key(cache_keys[i]), cache_misses)
+    miss_indexes = [i for i, result in enumerate(results) if result is cache_misses]
+    # Identical inputs within one job (e.g. the same template copied around a ZIP) are redacted only once
+    first_index_for_key = {}
+    for i in miss_indexes:
+        first_index_for_key.setdefault(cache_keys[i], i)
+    unique_miss_indexes = list(first_index_for_key.values())
+    miss_sizes = [task_sizes[i] for i in unique_miss_indexes] if task_sizes is not None else None
+    miss_results = run_uncached_tasks([redaction_tasks[i] for i in unique_miss_indexes], miss_sizes)
+    results_by_key = {}
+    for i, result in zip(unique_miss_indexes, miss_results):
+        if isinstance(result, Exception):
+            results_by_key[cache_keys[i]] = result
+            continue
+        results_by_key[cache_keys[i]] = result.content
+        # Only "no names found" holds for any redaction text; a file left unchanged because the redaction text
+        # was the name itself must still be redacted once the redaction text changes
+        result_cache.put(cache_keys[i] if result.names_found else unchanged_result_cache_key(cache_keys[i]), result.content)
+    for i in miss_indexes:
+        results[i] = results_by_key[cache_keys[i]]
+    return results
@@ -0,0 +1,599 @@
+"""
+Redaction core: name matching and the DOCX/PPTX/PDF redactors, plus the process-pool entry point.
+Kept out of the Streamlit script so pool workers pickle and import it by a stable module name.
+"""
+from lxml import etree
+import fitz  # PyMuPDF
+try:
+    import ahocorasick  # pyahocorasick
+except ImportError: # Optional: fall back to a single compiled regex alternation
+    ahocorasick = None
+import io
+import os
+import zipfile
+import re
+import functools
+import shutil
+import tempfile
+import contextlib
+from collections import namedtuple
+
+ZIP_MEMBER_BUFFER_SIZE = 64 * 1024 # Buffered read size when streaming members out of an uploaded ZIP
+OUTPUT_SPOOL_MAX_SIZE = 8 * 1024 * 1024 # Saved outputs larger than this spill from RAM to a temp file
+# Redacted PDFs: drop unused objects and renumber the rest (garbage=3), deflate streams but leave images as-is.
+# No duplicate-object compaction (garbage=4): MuPDF's pass is quadratic in the object count and gains nothing after a redaction.
+# A full content-stream clean (clean=True) is opt-in from the sidebar since it is expensive on complex PDFs.
+PDF_SAVE_OPTIONS = dict(garbage=3, deflate=True, deflate_images=False, deflate_fonts=True)
+# When few pages were redacted, only unused objects are dropped (garbage=1): renumbering walks every object and
+# takes seconds on large PDFs, for under 1% of size. The replaced content streams are unreferenced, so they still go.
+PDF_LIGHT_SAVE_MAX_REDACTED_PAGE_RATIO = 0.05
+PDF_LIGHT_SAVE_OPTIONS = dict(PDF_SAVE_OPTIONS, garbage=1)
+PDF_TEXT_FLAGS = fitz.TEXT_PRESERVE_LIGATURES | fitz.TEXT_PRESERVE_WHITESPACE # Text extraction flags for every PDF page
+# Redactions only remove text: images and vector line art under a black box are left alone (the box already hides them,
+# and MuPDF's default deletes whole drawings that merely touch it, e.g. table borders). Older PyMuPDF has no graphics option.
+PDF_APPLY_REDACTIONS_OPTIONS = dict(images=fitz.PDF_REDACT_IMAGE_NONE)
+if hasattr(fitz, "PDF_REDACT_LINE_ART_NONE"):
+    PDF_APPLY_REDACTIONS_OPTIONS["graphics"] = fitz.PDF_REDACT_LINE_ART_NONE
+
+def build_name_automaton(names_to_redact_variations):
+    """
+    Builds a single Aho-Corasick automaton over all casefolded name variations.
+    Built once per redaction job and shared by every run of every file.
+    """
+    automaton = ahocorasick.Automaton()
+    for name_var in names_to_redact_variations:
+        if not name_var: continue
+        folded_name_var = name_var.casefold()
+        automaton.add_word(folded_name_var, len(folded_name_var)) # Value is the key length, used to recover the match start
+    automaton.make_automaton()
+    return automaton
+
+def build_name_regex(names_to_redact_variations):
+    """
+    Compiles all casefolded variations into one alternation, matched against casefolded text.
+    Case-sensitive on purpose: re.IGNORECASE makes a large alternation several times slower.
+    Longest variations come first so the regex engine prefers "Dr. Doe" over "Doe" at the same position.
+    The match sits in a lookahead, so finditer reports every position a variation starts at, overlapping ones included;
+    whole-word checks are left to find_name_spans, on the original text as for the automaton.
+    """
+    folded_variations = sorted({v.casefold() for v in names_to_redact_variations if v}, key=len, reverse=True)
+    alternation = '|'.join(re.escape(v) for v in folded_variations)
+    return re.compile(r'(?=(' + alternation + r'))')
+
+def build_first_chars_regex(names_to_redact_variations):
+    """
+    Compiles a character class of every variation's first letter. A text with no hit
+    cannot contain any name, so it is rejected with one C-level scan.
+    """
+    first_chars = set()
+    for name_var in names_to_redact_variations:
+        if not name_var: continue
+        first_chars.add(name_var[0])
+        first_chars.add(name_var.lower()[0])
+        first_chars.add(name_var.casefold()[0])
+    if not first_chars:
+        return re.compile(r'(?!)') # Never matches
+    return re.compile('[' + ''.join(re.escape(c) for c in sorted(first_chars)) + ']', re.IGNORECASE)
+
+# engine: an Aho-Corasick automaton or a compiled regex alternation; first_chars_re: the prefilter above
+NameMatcher = namedtuple("NameMatcher", ["engine", "first_chars_re"])
+
+def create_name_matcher(names_to_redact_variations):
+    """
+    Returns the NameMatcher shared by a redaction job. Its engine is an Aho-Corasick automaton
+    when pyahocorasick is installed, otherwise a compiled regex.
+    """
+    if ahocorasick is not None:
+        engine = build_name_automaton(names_to_redact_variations)
+    else:
+        engine = build_name_regex(names_to_redact_variations)
+    return NameMatcher(engine, build_first_chars_regex(names_to_redact_variations))
+
+def _is_word_char(ch):
+    """Mirrors the regex word class: letters, digits and underscore."""
+    return ch.isalnum() or ch == '_'
+
+def _casefold_with_index_map(text):
+    """
+    Casefolds text once and returns (folded_text, index_map) where index_map[i] is the position in the
+    original text of folded_text[i]. index_map is None when folding preserved the length (the common case).
+    """
+    folded_text = text.casefold()
+    if len(folded_text) == len(text):
+        return folded_text, None
+    # Some characters (e.g. 'ß' -> 'ss', 'İ') fold to more than one character, so offsets need mapping back
+    folded_chars, index_map = [], []
+    for i, ch in enumerate(text):
+        folded_ch = ch.casefold()
+        folded_chars.append(folded_ch)
+        index_map.extend([i] * len(folded_ch))
+    return "".join(folded_chars), index_map
+
+def find_name_spans(text, name_matcher):
+    """
+    Scans text once with the matcher and returns sorted, non-overlapping (start, end) spans of
+    whole-word, case-insensitive matches. Overlaps resolve leftmost-longest, so "Dr. Doe" wins over "Doe".
+    """
+    if not text or not name_matcher.first_chars_re.search(text): return []
+    engine = name_matcher.engine
+    folded_text, index_map = _casefold_with_index_map(text)
+    text_len = len(text)
+
+    # Whole-word checks (the equivalent of wrapping each name in \b...\b, but also correct for names ending in ".")
+    # run on the original text: casefolding can change what surrounds a match (e.g. "İ" folds to "i" + a combining dot)
+    candidate_spans = []
+    if isinstance(engine, re.Pattern):
+        for match in engine.finditer(folded_text):
+            fold_start, fold_end = match.span(1)
+            start = index_map[fold_start] if index_map is not None else fold_start
+            if start > 0 and _is_word_char(text[start - 1]): continue
+            while match is not None: # Longest variation starting here first, then shorter ones until one ends a word
+                fold_end = match.end(1)
+                end = index_map[fold_end - 1] + 1 if index_map is not None else fold_end
+                if end >= text_len or not _is_word_char(text[end]):
+                    candidate_spans.append((start, end))
+                    break
+                match = engine.match(folded_text, fold_start, fold_end - 1)
+    elif engine.kind == ahocorasick.AHOCORASICK:
+        for end_idx, match_len in engine.iter(folded_text):
+            start, end = end_idx - match_len + 1, end_idx + 1
+            if index_map is not None:
+                start, end = index_map[start], index_map[end - 1] + 1
+            if start > 0 and _is_word_char(text[start - 1]): continue
+            if end < text_len and _is_word_char(text[end]): continue
+            candidate_spans.append((start, end))
+
+    # Greedy left-to-right selection, preferring the longer match at the same start
+    candidate_spans.sort(key=lambda span: (span[0], -span[1]))
+    spans, cursor = [], 0
+    for start, end in candidate_spans:
+        if start >= cursor:
+            spans.append((start, end))
+            cursor = end
+    return spans
+
+def new_output_buffer():
+    """
+    Returns a binary buffer for a saved document: kept in memory while small, spilled to disk once it
+    exceeds OUTPUT_SPOOL_MAX_SIZE, so large outputs don't grow one Python bytes buffer by reallocation.
+    """
+    return tempfile.SpooledTemporaryFile(max_size=OUTPUT_SPOOL_MAX_SIZE, mode='w+b')
+
+# names_found: some name matched; modified: some run's text actually changed (not the case when the
+# redaction text equals the matched name). Only a result with no names found is independent of the redaction text.
+TextRedaction = namedtuple("TextRedaction", ["names_found", "modified"])
+
+def redact_text_in_runs(runs, name_matcher, redaction_string="[REDACTED]"):
+    """
+    Scans the paragraph's runs (any objects with a .text attribute, e.g. its text nodes) as one joined string,
+    so a name split across formatting runs (e.g. "Jo" + "hn Doe") is still caught, then writes the result back run by run.
+    The redaction string goes into the run where a match starts; later runs it covers lose only the matched characters.
+    Returns a TextRedaction.
+    """
+    if not runs: # e.g. empty paragraphs, or ones holding only a drawing
+        return TextRedaction(False, False)
+    run_texts = [run.text for run in runs]
+    joined_text = "".join(run_texts)
+    if not joined_text.strip(): # Skip empty or whitespace-only paragraphs
+        return TextRedaction(False, False)
+
+    spans = find_name_spans(joined_text, name_matcher)
+    if not spans:
+        return TextRedaction(False, False)
+
+    modified, span_idx, run_start = False, 0, 0
+    for run, run_text in zip(runs, run_texts):
+        run_end = run_start + len(run_text)
+        while span_idx < len(spans) and spans[span_idx][1] <= run_start: # Spans that ended in earlier runs
+            span_idx += 1
+        pieces, cursor = [], run_start
+        next_span_idx = span_idx
+        while next_span_idx < len(spans) and spans[next_span_idx][0] < run_end:
+            start, end = spans[next_span_idx]
+            if start >= run_start: # The match starts in this run
+                pieces.append(joined_text[cursor:start])
+                pieces.append(redaction_string)
+            cursor = min(end, run_end)
+            next_span_idx += 1
+        if next_span_idx != span_idx: # This run overlaps at least one match
+            pieces.append(joined_text[cursor:run_end])
+            new_run_text = "".join(pieces)
+            if new_run_text != run_text: # e.g. the redaction text equals the matched name
+                run.text = new_run_text
+                modified = True
+        run_start = run_end
+
+    return TextRedaction(True, modified)
+
+# Paragraph text in .docx/.pptx parts is rewritten directly in the package XML
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+A_NS = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+CONTENT_TYPES_NS = "{http://schemas.openxmlformats.org/package/2006/content-types}"
+XML_SPACE_ATTR = "{http://www.w3.org/XML/1998/namespace}space"
+OOXML_XML_PARSER = etree.XMLParser(resolve_entities=False, no_network=True)
+DOCX_TEXT_PART_CONTENT_TYPES = frozenset({ # Main document (incl. macro-enabled and template), headers, footers, notes, comments, comment people
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml",
+    "application/vnd.ms-word.document.macroEnabled.main+xml",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.template.main+xml",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.header+xml",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.footer+xml",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.footnotes+xml",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.endnotes+xml",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.comments+xml",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.people+xml",
+})
+PPTX_TEXT_PART_CONTENT_TYPES = frozenset({ # Slides and speaker notes
+    "application/vnd.openxmlformats-officedocument.presentationml.slide+xml",
+    "application/vnd.openxmlformats-officedocument.presentationml.notesSlide+xml",
+})
+# Text of a <w:p>, in document order, at any wrapper depth (hyperlinks, tracked changes and moves, content controls,
+# custom XML, bidi runs, ...): visible and deleted text, plus the run children that stand for a character
+DOCX_TEXT_TAGS = (W_NS + "t", W_NS + "delText", W_NS + "tab", W_NS + "ptab", W_NS + "br", W_NS + "cr", W_NS + "noBreakHyphen")
+# Wrappers whose text is no longer in the paragraph: tracked deletions (<w:delText>) and the source side of a move (<w:t>)
+DOCX_REMOVED_TEXT_TAGS = frozenset({W_NS + "del", W_NS + "moveFrom"})
+# Elements naming a person: comments, tracked changes and people.xml entries (w:author, w15:author, ...)
+OOXML_AUTHOR_ELEMENT_XPATH = etree.XPath("//*[@*[local-name()='author']]")
+# Run children that stand for a character, as python-docx's Run.text renders them; a name may span a non-breaking hyphen
+DOCX_SEPARATOR_TEXT = {W_NS + "tab": "\t", W_NS + "ptab": "\t", W_NS + "br": "\n", W_NS + "cr": "\n", W_NS + "noBreakHyphen": "-"}
+
+class OoxmlTextNode:
+    """Gives a <w:t>/<w:delText>/<a:t> element the .text attribute redact_text_in_runs reads and writes."""
+    __slots__ = ("element",)
+
+    def __init__(self, element):
+        self.element = element
+
+    @property
+    def text(self):
+        return self.element.text or ""
+
+    @text.setter
+    def text(self, value):
+        self.element.text = value
+        if self.element.tag in (W_NS + "t", W_NS + "delText"): # Word drops leading/trailing spaces without this
+            self.element.set(XML_SPACE_ATTR, "preserve")
+
+class OoxmlSeparator:
+    """
+    A tab, line break or non-breaking hyphen inside a paragraph: contributes its character to the joined text.
+    Covered by a match, it is removed; a match starting on it puts the redaction text in a new text_tag element in its place.
+    """
+    __slots__ = ("_text", "element", "text_tag")
+
+    def __init__(self, text, element, text_tag=None):
+        self._text, self.element, self.text_tag = text, element, text_tag
+
+    @property
+    def text(self):
+        return self._text
+
+    @text.setter
+    def text(self, value):
+        if value == self._text: return
+        parent = self.element.getparent()
+        if value and self.text_tag is not None:
+            text_element = etree.Element(self.text_tag)
+            OoxmlTextNode(text_element).text = value
+            parent.replace(self.element, text_element)
+            self.element = text_element
+        else:
+            parent.remove(self.element)
+        self._text = value
+
+def docx_paragraph_text_groups(p):
+    """
+    The text nodes (and tabs/breaks) of a <w:p>, excluding paragraphs nested in its text boxes, as groups matched
+    independently: the visible text, then each tracked deletion or moved-away stretch on its own (its text was never
+    adjacent to the visible text).
+    """
+    text_groups = {None: []} # Removed-text wrapper (None for visible text) -> its nodes, in document order
+    for node in p.iter(*DOCX_TEXT_TAGS):
+        if node.getparent().tag != W_NS + "r": continue # e.g. <w:tab> tab stops in the paragraph properties
+        removed_wrapper = None
+        for ancestor in node.iterancestors():
+            if ancestor.tag == W_NS + "p": break
+            if removed_wrapper is None and ancestor.tag in DOCX_REMOVED_TEXT_TAGS:
+                removed_wrapper = ancestor
+        if ancestor is not p: continue # Belongs to a paragraph nested in a text box, matched on its own
+        if node.tag in DOCX_SEPARATOR_TEXT:
+            text_tag = W_NS + "delText" if removed_wrapper is not None and removed_wrapper.tag == W_NS + "del" else W_NS + "t"
+            text_node = OoxmlSeparator(DOCX_SEPARATOR_TEXT[node.tag], node, text_tag)
+        else:
+            text_node = OoxmlTextNode(node)
+        text_groups.setdefault(removed_wrapper, []).append(text_node)
+    return list(text_groups.values())
+
+def pptx_paragraph_text_groups(p):
+    """The <a:t> nodes (and line breaks) of an <a:p>, in order, as a single group."""
+    text_nodes = []
+    for child in p:
+        if child.tag == A_NS + "r":
+            text_nodes.extend(OoxmlTextNode(t) for t in child.iter(A_NS + "t"))
+        elif child.tag == A_NS + "br":
+            text_nodes.append(OoxmlSeparator("\n", child))
+    return [text_nodes]
+
+def redact_author_attributes(part_root, name_matcher, redaction_string):
+    """
+    Replaces, as a whole, every author attribute (comments, tracked changes, comment people) that contains a name,
+    together with the initials beside it. Returns a TextRedaction.
+    """
+    names_found = modified = False
+    for element in OOXML_AUTHOR_ELEMENT_XPATH(part_root):
+        author_attrs = [attr for attr in element.attrib if etree.QName(attr).localname == "author"]
+        if not any(find_name_spans(element.get(attr), name_matcher) for attr in author_attrs): continue
+        names_found = True
+        for attr in element.attrib:
+            if etree.QName(attr).localname in ("author", "initials") and element.get(attr) != redaction_string:
+                element.set(attr, redaction_string)
+                modified = True
+    return TextRedaction(names_found, modified)
+
+def ooxml_part_names(package_zip, content_types):
+    """Returns the package members whose content type ([Content_Types].xml override or extension default) is in content_types."""
+    content_types_root = etree.fromstring(package_zip.read("[Content_Types].xml"), OOXML_XML_PARSER)
+    default_types = {d.get("Extension", "").lower(): d.get("ContentType") for d in content_types_root.iter(CONTENT_TYPES_NS + "Default")}
+    override_types = {o.get("PartName", "").lstrip("/").lower(): o.get("ContentType") for o in content_types_root.iter(CONTENT_TYPES_NS + "Override")}
+    part_names = []
+    for member_name in package_zip.namelist():
+        member_key = member_name.lower()
+        member_type = override_types.get(member_key) or default_types.get(member_key.rpartition(".")[2])
+        if member_type in content_types:
+            part_names.append(member_name)
+    return part_names
+
+def write_ooxml_package(package_zip, replaced_members):
+    """
+    Writes a copy of an open .docx/.pptx package in which only replaced_members ({member_name: xml_bytes}) are new.
+    Every other member is streamed across unchanged, keeping its name, timestamp and stored/deflated choice.
+    """
+    bio = new_output_buffer()
+    with zipfile.ZipFile(bio, 'w') as output_zip:
+        for member_info in package_zip.infolist():
+            member_name = member_info.filename
+            output_info = zipfile.ZipInfo(member_name, date_time=member_info.date_time)
+            output_info.external_attr = member_info.external_attr
+            # Keep the producer's choice per member; anything exotic is written deflated like Office does
+            output_info.compress_type = member_info.compress_type if member_info.compress_type == zipfile.ZIP_STORED else zipfile.ZIP_DEFLATED
+            if member_name in replaced_members:
+                output_zip.writestr(output_info, replaced_members[member_name])
+            else:
+                with package_zip.open(member_info) as source_member, output_zip.open(output_info, 'w') as output_member:
+                    shutil.copyfileobj(source_member, output_member, ZIP_MEMBER_BUFFER_SIZE)
+    bio.seek(0)
+    return bio
+
+def redact_ooxml_package(package_stream, name_matcher, redaction_string, text_part_content_types, paragraph_tag, paragraph_text_groups):
+    """
+    Redacts every paragraph of a .docx/.pptx package's text parts, and the author names recorded on comments and
+    tracked changes, by editing their XML directly, without building python-docx/python-pptx object models.
+    Only parts that changed are re-serialized.
+    Returns (redacted package or None if nothing changed, whether any name was found).
+    """
+    replaced_members, names_found = {}, False
+    with zipfile.ZipFile(package_stream) as package_zip:
+        for member_name in ooxml_part_names(package_zip, text_part_content_types):
+            part_root = etree.fromstring(package_zip.read(member_name), OOXML_XML_PARSER)
+            part_names_found, part_modified = redact_author_attributes(part_root, name_matcher, redaction_string)
+            # Every paragraph in the part: body, tables at any depth, text boxes, group shapes alike
+            for p in part_root.iter(paragraph_tag):
+                for text_nodes in paragraph_text_groups(p):
+                    text_redaction = redact_text_in_runs(text_nodes, name_matcher, redaction_string)
+                    part_names_found = part_names_found or text_redaction.names_found
+                    part_modified = part_modified or text_redaction.modified
+            names_found = names_found or part_names_found
+            if part_modified:
+                replaced_members[member_name] = etree.tostring(part_root, xml_declaration=True, encoding="UTF-8", standalone=True)
+        if not replaced_members: return None, names_found
+        return write_ooxml_package(package_zip, replaced_members), names_found
+
+def redact_docx(docx_file_stream, name_matcher, redaction_string):
+    return redact_ooxml_package(docx_file_stream, name_matcher, redaction_string,
+                                DOCX_TEXT_PART_CONTENT_TYPES, W_NS + "p", docx_paragraph_text_groups)
+
+def redact_pptx(pptx_file_stream, name_matcher, redaction_string):
+    return redact_ooxml_package(pptx_file_stream, name_matcher, redaction_string,
+                                PPTX_TEXT_PART_CONTENT_TYPES, A_NS + "p", pptx_paragraph_text_groups)
+
+def _on_same_line(rect_a, rect_b):
+    """True when two rects share at least half of the shorter one's height."""
+    vertical_overlap = min(rect_a.y1, rect_b.y1) - max(rect_a.y0, rect_b.y0)
+    return vertical_overlap >= 0.5 * min(rect_a.height, rect_b.height)
+
+def merge_redaction_rects(rects):
+    """
+    Coalesces overlapping hit rects on the same text line (e.g. "Dr. Doe" and "Doe") into one rect,
+    so each region gets a single redaction annotation. One sort plus a linear sweep.
+    """
+    merged_rects = []
+    for rect in sorted(rects, key=lambda r: (r.y0, r.x0)):
+        if merged_rects and merged_rects[-1].intersects(rect) and _on_same_line(merged_rects[-1], rect):
+            merged_rects[-1] = merged_rects[-1] | rect
+        else:
+            merged_rects.append(fitz.Rect(rect))
+    return merged_rects
+
+def _fold_for_pdf_search(text):
+    """Whitespace-collapsed, casefolded form for prefiltering; collapsed because page text is matched with whitespace runs collapsed."""
+    return " ".join(text.split()).casefold()
+
+@functools.lru_cache(maxsize=4)
+def folded_pdf_variation_buckets(names_variations_tuple):
+    """
+    The variations in _fold_for_pdf_search form, folded once per name list rather than once per page and
+    bucketed by first character: {first_char: [folded_name_var, ...]}.
+    """
+    buckets = {}
+    for name_var in names_variations_tuple:
+        folded_name_var = _fold_for_pdf_search(name_var)
+        if folded_name_var:
+            buckets.setdefault(folded_name_var[0], []).append(folded_name_var)
+    return buckets
+
+def pdf_page_may_contain_names(page_text, names_to_redact_variations):
+    """
+    Whether some variation occurs in a page's plain text; only pages where one does are matched character by character.
+    Substring checks run only for variations whose first character occurs on the page, and stop at the first hit.
+    """
+    folded_page_text = _fold_for_pdf_search(page_text)
+    page_chars = set(folded_page_text)
+    return any(
+        folded_name_var in folded_page_text
+        for first_char, bucket in folded_pdf_variation_buckets(tuple(names_to_redact_variations)).items() if first_char in page_chars
+        for folded_name_var in bucket
+    )
+
+@contextlib.contextmanager
+def pdf_path_for_stream(pdf_file_stream):
+    """
+    Yields a filesystem path for a PDF stream (e.g. a ZIP member) so MuPDF can read it from disk instead of from
+    a full bytes copy. The stream is copied to a temporary file in 1 MiB chunks, removed afterwards even if the copy fails.
+    """
+    spooled_pdf = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False)
+    try:
+        with spooled_pdf:
+            shutil.copyfileobj(pdf_file_stream, spooled_pdf, length=1 << 20)
+        yield spooled_pdf.name
+    finally:
+        with contextlib.suppress(OSError): os.remove(spooled_pdf.name)
+
+def redact_pdf(pdf_file_stream, name_matcher, names_to_redact_variations, redaction_string, clean_output=False): # redaction_string not used for PDF visual
+    # The document is closed on every path, including errors, so MuPDF's copy of a failed PDF isn't kept alive
+    if isinstance(pdf_file_stream, io.BytesIO): # Already in memory: getvalue() shares the upload's bytes, so skip the temp file
+        with fitz.open(stream=pdf_file_stream, filetype="pdf") as doc:
+            return _redact_pdf_document(doc, name_matcher, names_to_redact_variations, clean_output)
+    with pdf_path_for_stream(pdf_file_stream) as pdf_path, fitz.open(pdf_path, filetype="pdf") as doc:
+        return _redact_pdf_document(doc, name_matcher, names_to_redact_variations, clean_output)
+
+def pdf_chars_text(rawdict):
+    """
+    Flattens a page's get_text("rawdict") into one string for the name matcher: each line's characters, with runs of
+    whitespace collapsed to one space (as names are matched), lines joined by a space.
+    Returns (text, char_boxes), where char_boxes[i] is (bbox, (block_no, line_no)) for text[i], or None for a joining space.
+    """
+    text_parts, char_boxes = [], []
+    for block in rawdict["blocks"]:
+        if block.get("type", 0) != 0: continue # Image blocks have no text
+        for line_no, line in enumerate(block["lines"]):
+            if text_parts and text_parts[-1] != " ": # Separate from the previous line
+                text_parts.append(" "); char_boxes.append(None)
+            line_key = (block["number"], line_no)
+            for span in line["spans"]:
+                for char in span["chars"]:
+                    c = char["c"]
+                    if c.isspace():
+                        if not text_parts or text_parts[-1] == " ": continue
+                        c = " "
+                    text_parts.append(c)
+                    char_boxes.append((char["bbox"], line_key))
+    return "".join(text_parts), char_boxes
+
+def pdf_rects_for_spans(char_boxes, spans):
+    """Returns the rects to black out for matched spans: per span and text line, the union of its characters' boxes."""
+    rects = []
+    for start, end in spans:
+        line_rects = {} # (block_no, line_no) -> Rect; a name wrapped onto the next line gets one rect per line
+        for char_box in char_boxes[start:end]:
+            if char_box is None: continue
+            bbox, line_key = char_box
+            char_rect = fitz.Rect(bbox)
+            if char_rect.is_empty or char_rect.is_infinite: continue # Validate rect
+            line_rects[line_key] = line_rects[line_key] | char_rect if line_key in line_rects else char_rect
+        rects.extend(line_rects.values())
+    return rects
+
+def _redact_pdf_document(doc, name_matcher, names_to_redact_variations, clean_output=False):
+    """Blacks out every variation in an opened PDF. Returns the saved result, or None if nothing matched."""
+    redacted_page_count = 0
+
+    for page_num in range(len(doc)):
+        page = doc.load_page(page_num)
+        # Extract the page's text layer once and reuse it for both passes below
+        page_textpage = page.get_textpage(flags=PDF_TEXT_FLAGS)
+        # Cheap rejects: skip pages with none of the variations' first characters (one C-level scan, no folding),
+        # then pages whose plain text contains none of the variations
+        page_text = page_textpage.extractText()
+        if not name_matcher.first_chars_re.search(page_text): continue
+        if not pdf_page_may_contain_names(page_text, names_to_redact_variations): continue
+
+        # One character-level extraction per page, matched with the same whole-word matcher as DOCX/PPTX text;
+        # character boxes black out just the name, not punctuation attached to it
+        page_rawdict = page.get_text("rawdict", textpage=page_textpage)
+        page_textpage = None # Released before the page is redacted; it would describe the pre-redaction content
+        page_chars_text, char_boxes = pdf_chars_text(page_rawdict)
+        all_rects_to_redact_on_page = pdf_rects_for_spans(char_boxes, find_name_spans(page_chars_text, name_matcher))
+
+        if all_rects_to_redact_on_page:
+            redacted_page_count += 1
+            for r in merge_redaction_rects(all_rects_to_redact_on_page):
+                try:
+                    page.add_redact_annot(r, text="", fill=(0, 0, 0)) # Add redaction annotation
+                except Exception as annot_e:
+                    # st.warning(f"Could not add PDF redaction annotation for rect {r} on page {page_num+1}: {annot_e}")
+                    pass # Continue if one annotation fails, to not halt all page redaction
+            try:
+                page.apply_redactions(**PDF_APPLY_REDACTIONS_OPTIONS) # Apply all on page
+            except Exception as apply_e:
+                # st.error(f"Error applying PDF redactions on page {page_num+1}: {apply_e}")
+                pass
+    
+    if redacted_page_count:
+        bio = io.BytesIO() # Not spooled: PyMuPDF treats file objects with a .name as paths
+        light_save = redacted_page_count < PDF_LIGHT_SAVE_MAX_REDACTED_PAGE_RATIO * len(doc)
+        doc.save(bio, clean=clean_output, **(PDF_LIGHT_SAVE_OPTIONS if light_save else PDF_SAVE_OPTIONS))
+        bio.seek(0)
+        return bio
+    return None
+
+# Per-process matcher cache for pool workers (Streamlit's caches are not used outside the script thread)
+_worker_name_matcher = functools.lru_cache(maxsize=4)(create_name_matcher)
+
+@contextlib.contextmanager
+def open_task_source(task_source):
+    """
+    Yields a readable stream for a task's input: the raw bytes of an upload, or a
+    (zip_path, member_name) pair streamed from the spooled ZIP on disk through a buffered reader.
+    """
+    if isinstance(task_source, bytes):
+        yield io.BytesIO(task_source)
+        return
+    zip_path, member_name = task_source
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        with io.BufferedReader(zip_ref.open(member_name), buffer_size=ZIP_MEMBER_BUFFER_SIZE) as member_stream:
+            yield member_stream
+
+# content: the redacted file as bytes, or None if nothing changed; names_found: as in TextRedaction
+RedactionResult = namedtuple("RedactionResult", ["content", "names_found"])
+
+def redact_task(task, name_matcher=None):
+    """
+    Process-pool entry point. Takes a picklable
+    (task_source, file_extension, names_variations_tuple, redaction_string, clean_pdf_output)
+    task and returns a RedactionResult. In-process callers may pass their already-built name_matcher.
+    """
+    task_source, file_extension, names_variations_tuple, redaction_string, clean_pdf_output = task
+    if not names_variations_tuple: # Nothing can match: don't open the file at all
+        return RedactionResult(None, False)
+    if name_matcher is None:
+        name_matcher = _worker_name_matcher(names_variations_tuple)
+    redacted_content, names_found = None, False
+    with open_task_source(task_source) as file_stream:
+        if file_extension == ".docx": redacted_content, names_found = redact_docx(file_stream, name_matcher, redaction_string)
+        elif file_extension == ".pptx": redacted_content, names_found = redact_pptx(file_stream, name_matcher, redaction_string)
+        elif file_extension == ".pdf":
+            redacted_content = redact_pdf(file_stream, name_matcher, names_variations_tuple, redaction_string, clean_pdf_output)
+            names_found = redacted_content is not None # Every PDF match is blacked out
+    if not redacted_content: return RedactionResult(None, names_found)
+    with redacted_content:
+        redacted_content.seek(0)
+        return RedactionResult(redacted_content.read(), names_found)
+
+def redact_task_or_exception(task, name_matcher=None):
+    """
+    redact_task, returning the exception a task raised instead of raising it. Submitted to the pool in this form,
+    so a future that fails never means the task itself failed: its input never reached or outlived a worker.
+    """
+    try:
+        return redact_task(task, name_matcher)
+    except Exception as e:
+        return e
@@ -0,0 +1,111 @@
+import zipfile
+
+import pytest
+
+from cache import (REDACTION_CACHE_ENTRY_OVERHEAD_BYTES, RedactionResultCache, redaction_cache_key, run_redaction_tasks,
+                   upload_crc_size, zip_member_content_keys)
+from redaction import RedactionResult
+
+NAMES = ("John Doe",)
+
+class RecordingRunner:
+    """Stands in for the process pool: records the tasks it is given and returns canned results."""
+    def __init__(self, result_for_task):
+        self.result_for_task = result_for_task
+        self.batches = []
+
+    def __call__(self, redaction_tasks, task_sizes=None):
+        if redaction_tasks: self.batches.append(list(redaction_tasks))
+        return [self.result_for_task(task) for task in redaction_tasks]
+
+def docx_task(content, redaction_string="[X]", clean_pdf_output=False):
+    return (content, ".docx", NAMES, redaction_string, clean_pdf_output)
+
+def test_no_names_found_result_is_reused_for_any_redaction_text():
+    result_cache = RedactionResultCache(1 << 20)
+    runner = RecordingRunner(lambda task: RedactionResult(None, False))
+    assert run_redaction_tasks([docx_task(b"plain")], runner, result_cache) == [None]
+    assert run_redaction_tasks([docx_task(b"plain", "[GONE]")], runner, result_cache) == [None]
+    assert len(runner.batches) == 1
+
+def test_unmodified_result_with_names_found_is_redone_for_a_new_redaction_text():
+    # The redaction text was the name itself, so the file came back unchanged; another redaction text must change it
+    result_cache = RedactionResultCache(1 << 20)
+    runner = RecordingRunner(lambda task: RedactionResult(None if task[3] == "John Doe" else b"redacted", True))
+    assert run_redaction_tasks([docx_task(b"named", "John Doe")], runner, result_cache) == [None]
+    assert run_redaction_tasks([docx_task(b"named", "[X]")], runner, result_cache) == [b"redacted"]
+    assert run_redaction_tasks([docx_task(b"named", "[X]")], runner, result_cache) == [b"redacted"]
+    assert len(runner.batches) == 2
+
+def test_pdf_result_is_shared_across_redaction_texts():
+    pdf_task = (b"%PDF", ".pdf", NAMES, "[X]", False)
+    assert redaction_cache_key(pdf_task) == redaction_cache_key(pdf_task[:3] + ("[GONE]",) + pdf_task[4:])
+
+def test_clean_pdf_output_only_keys_pdfs():
+    assert redaction_cache_key(docx_task(b"office", clean_pdf_output=True)) == redaction_cache_key(docx_task(b"office"))
+    pdf_task = (b"%PDF", ".pdf", NAMES, "[X]", False)
+    assert redaction_cache_key(pdf_task) != redaction_cache_key(pdf_task[:4] + (True,))
+
+def test_identical_inputs_in_one_job_are_redacted_once():
+    runner = RecordingRunner(lambda task: RedactionResult(b"out", True))
+    results = run_redaction_tasks([docx_task(b"same"), docx_task(b"same"), docx_task(b"other")], runner, RedactionResultCache(1 << 20))
+    assert results == [b"out"] * 3
+    assert [task[0] for task in runner.batches[0]] == [b"same", b"other"]
+
+def test_errors_are_returned_and_not_cached():
+    result_cache = RedactionResultCache(1 << 20)
+    error = ValueError("broken")
+    runner = RecordingRunner(lambda task: error)
+    assert run_redaction_tasks([docx_task(b"bad")], runner, result_cache) == [error]
+    assert run_redaction_tasks([docx_task(b"bad")], runner, result_cache) == [error]
+    assert len(runner.batches) == 2
+
+def test_cache_is_bounded_by_bytes_in_lru_order():
+    entry_size = REDACTION_CACHE_ENTRY_OVERHEAD_BYTES + 100
+    result_cache = RedactionResultCache(3 * entry_size)
+    for key in "abc":
+        result_cache.put(key, b"x" * 100)
+    assert result_cache.get("a") == b"x" * 100 # "a" becomes the most recently used
+    result_cache.put("d", b"x" * 100)
+    assert result_cache.get("b") is None
+    assert [result_cache.get(key) is not None for key in "acd"] == [True, True, True]
+
+def test_cache_replaces_a_key_and_skips_outputs_over_budget():
+    result_cache = RedactionResultCache(2 * REDACTION_CACHE_ENTRY_OVERHEAD_BYTES + 10)
+    result_cache.put("a", b"old")
+    result_cache.put("a", b"new")
+    result_cache.put("b", None)
+    assert (result_cache.get("a"), result_cache.get("b", "missing")) == (b"new", None)
+    result_cache.put("huge", b"x" * (3 * REDACTION_CACHE_ENTRY_OVERHEAD_BYTES))
+    assert result_cache.get("huge", "missing") == "missing"
+    assert result_cache.get("a") == b"new"
+
+@pytest.fixture
+def spooled_zip(tmp_path):
+    zip_path = tmp_path / "upload.zip"
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zip_out:
+        zip_out.writestr("a/template.docx", b"template bytes")
+        zip_out.writestr("b/template copy.docx", b"template bytes")
+        zip_out.writestr("upload.docx", b"also uploaded on its own")
+        zip_out.writestr("unique.docx", b"only in the zip")
+    return str(zip_path)
+
+def test_zip_members_are_hashed_only_when_they_may_be_copies(spooled_zip):
+    top_level_crc_sizes = {upload_crc_size(b"also uploaded on its own")}
+    with zipfile.ZipFile(spooled_zip) as zip_ref:
+        member_infos = zip_ref.infolist()
+        content_keys = zip_member_content_keys(zip_ref, member_infos, b"archive", top_level_crc_sizes)
+    assert content_keys[0] == content_keys[1] # In-archive copies share a content hash
+    assert isinstance(content_keys[2], bytes) # Same CRC and size as a top-level upload: hashed
+    assert content_keys[3] == (b"archive", "unique.docx") # Nothing to dedupe against: keyed by name
+
+def test_zip_member_and_top_level_upload_are_redacted_once(spooled_zip):
+    uploaded_bytes = b"also uploaded on its own"
+    with zipfile.ZipFile(spooled_zip) as zip_ref:
+        member_infos = zip_ref.infolist()
+        member_keys = zip_member_content_keys(zip_ref, member_infos, b"archive", {upload_crc_size(uploaded_bytes)})
+    tasks = [docx_task(uploaded_bytes)] + [docx_task((spooled_zip, member_info.filename)) for member_info in member_infos]
+    runner = RecordingRunner(lambda task: RedactionResult(b"out", True))
+    results = run_redaction_tasks(tasks, runner, RedactionResultCache(1 << 20), content_keys=[None] + member_keys)
+    assert results == [b"out"] * 5
+    assert [task[0] for task in runner.batches[0]] == [uploaded_bytes, (spooled_zip, "a/template.docx"), (spooled_zip, "unique.docx")]
@@ -0,0 +1,65 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+
+import redaction
+from redaction import NameMatcher, build_first_chars_regex, build_name_regex, find_name_spans, redact_text_in_runs
+
+def regex_matcher(variations):
+    return NameMatcher(build_name_regex(variations), build_first_chars_regex(variations))
+
+def automaton_matcher(variations):
+    return NameMatcher(redaction.build_name_automaton(variations), build_first_chars_regex(variations))
+
+@pytest.fixture(params=["automaton", "regex"])
+def make_matcher(request):
+    if request.param == "automaton":
+        if redaction.ahocorasick is None: pytest.skip("pyahocorasick not installed")
+        return automaton_matcher
+    return regex_matcher
+
+@pytest.mark.skipif(redaction.ahocorasick is None, reason="pyahocorasick not installed")
+def test_automaton_and_regex_engines_agree():
+    rng = random.Random(1234)
+    alphabet = ["jo", "hn", "doe", "dr.", "j.", " ", " ", ".", "-", "x", "ß", "ss", "İ", "i", "_", "JOHN", "Doe"]
+    variations_pool = ["John Doe", "Doe", "Dr. Doe", "J. Doe", "Dr. J.", "John", "Strauss", "İvan", "ss"]
+    for _ in range(2000):
+        variations = tuple(rng.sample(variations_pool, rng.randint(1, 4)))
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+        assert find_name_spans(text, automaton_matcher(variations)) == find_name_spans(text, regex_matcher(variations)), (variations, text)
+
+def test_longest_variation_wins(make_matcher):
+    assert find_name_spans("Ask Dr. Doe today", make_matcher(("Doe", "Dr. Doe"))) == [(4, 11)]
+
+def test_whole_words_only(make_matcher):
+    matcher = make_matcher(("Doe",))
+    assert find_name_spans("Doe, Doer, aDoe, Doe_1, DOE.", matcher) == [(0, 3), (24, 27)]
+
+def test_period_terminated_variation_needs_a_word_boundary_after_it(make_matcher):
+    # "\b" would match between "." and "S"; the variation must not end mid-word
+    assert find_name_spans("Dr. J.Smith and Dr. J. Smith", make_matcher(("Dr. J.",))) == [(16, 22)]
+
+def test_sharp_s_casefold_maps_back_to_original_text(make_matcher):
+    matcher = make_matcher(("Strauss",))
+    assert find_name_spans("Strauß, Straußen, STRAUSS", matcher) == [(0, 6), (18, 25)]
+
+def test_dotted_capital_i_is_still_a_word_character_before_a_match(make_matcher):
+    # "İ" folds to "i" + a combining dot; the dot must not count as a word boundary
+    assert find_name_spans("İDoe and İ Doe", make_matcher(("Doe",))) == [(11, 14)]
+    assert find_name_spans("İvan", make_matcher(("İvan",))) == [(0, 4)]
+
+def test_name_split_across_runs(make_matcher):
+    runs = [SimpleNamespace(text="Hello Jo"), SimpleNamespace(text="hn "), SimpleNamespace(text="Doe!")]
+    result = redact_text_in_runs(runs, make_matcher(("John Doe",)), "[X]")
+    assert result == (True, True)
+    assert [run.text for run in runs] == ["Hello [X]", "", "!"]
+
+def test_several_names_in_one_run_and_across_runs(make_matcher):
+    runs = [SimpleNamespace(text="Doe and D"), SimpleNamespace(text="oe, Doe")]
+    assert redact_text_in_runs(runs, make_matcher(("Doe",)), "[X]") == (True, True)
+    assert [run.text for run in runs] == ["[X] and [X]", ", [X]"]
+
+def test_redaction_text_equal_to_name_is_found_but_unmodified(make_matcher):
+    runs = [SimpleNamespace(text="John Doe")]
+    assert redact_text_in_runs(runs, make_matcher(("John Doe",)), "John Doe") == (True, False)
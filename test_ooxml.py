@@ -0,0 +1,101 @@
+import io
+import zipfile
+
+import pytest
+from lxml import etree
+
+from redaction import redact_task
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+A_NS = "http://schemas.openxmlformats.org/drawingml/2006/main"
+P_NS = "http://schemas.openxmlformats.org/presentationml/2006/main"
+
+def ooxml_package(content_types, part_name, part_xml):
+    bio = io.BytesIO()
+    with zipfile.ZipFile(bio, "w", zipfile.ZIP_DEFLATED) as package_zip:
+        package_zip.writestr("[Content_Types].xml",
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            f'<Override PartName="/{part_name}" ContentType="{content_types}"/></Types>')
+        package_zip.writestr(part_name, part_xml)
+    return bio.getvalue()
+
+def part_text(package_bytes, part_name):
+    with zipfile.ZipFile(io.BytesIO(package_bytes)) as package_zip:
+        part_root = etree.fromstring(package_zip.read(part_name))
+    return "".join(part_root.itertext())
+
+def test_docx_round_trip_through_redact_task():
+    document_xml = (
+        f'<w:document xmlns:w="{W_NS}"><w:body>'
+        '<w:p><w:r><w:t>Signed by Jo</w:t></w:r><w:r><w:t>hn Doe</w:t></w:r></w:p>'
+        '<w:p><w:hyperlink><w:ins w:id="1" w:author="x"><w:r><w:t>Link John Doe</w:t></w:r></w:ins></w:hyperlink></w:p>'
+        '<w:p><w:moveTo w:id="2" w:author="x"><w:r><w:t>Moved John Doe</w:t></w:r></w:moveTo></w:p>'
+        '<w:p><w:del w:id="3" w:author="John Doe"><w:r><w:delText>Deleted John Doe</w:delText></w:r></w:del></w:p>'
+        '<w:p><w:r><w:t>Nobody here</w:t></w:r></w:p>'
+        '</w:body></w:document>')
+    docx_bytes = ooxml_package(
+        "application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml", "word/document.xml", document_xml)
+    result = redact_task((docx_bytes, ".docx", ("John Doe", "Doe"), "[X]", False))
+    assert result.names_found
+    text = part_text(result.content, "word/document.xml")
+    assert "Doe" not in text
+    assert text == "Signed by [X]Link [X]Moved [X]Deleted [X]Nobody here"
+    with zipfile.ZipFile(io.BytesIO(result.content)) as package_zip:
+        assert "John Doe" not in package_zip.read("word/document.xml").decode()
+
+DOCX_MAIN_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"
+
+def docx_with_body(body_xml):
+    return ooxml_package(DOCX_MAIN_CONTENT_TYPE, "word/document.xml",
+                         f'<w:document xmlns:w="{W_NS}"><w:body>{body_xml}</w:body></w:document>')
+
+@pytest.mark.parametrize("paragraph_xml", [
+    '<w:moveFrom w:id="1" w:author="x"><w:r><w:t>John Doe</w:t></w:r></w:moveFrom>',
+    '<w:customXml w:element="x"><w:r><w:t>John Doe</w:t></w:r></w:customXml>',
+    '<w:dir w:val="ltr"><w:r><w:t>John Doe</w:t></w:r></w:dir>',
+    '<w:bdo w:val="ltr"><w:r><w:t>John Doe</w:t></w:r></w:bdo>',
+    '<w:sdt><w:sdtContent><w:sdt><w:sdtContent><w:r><w:t>John Doe</w:t></w:r></w:sdtContent></w:sdt></w:sdtContent></w:sdt>',
+    '<w:fldSimple w:instr="AUTHOR"><w:r><w:t>John Doe</w:t></w:r></w:fldSimple>',
+])
+def test_docx_runs_in_any_wrapper_are_redacted(paragraph_xml):
+    result = redact_task((docx_with_body(f"<w:p>{paragraph_xml}</w:p>"), ".docx", ("John Doe",), "[X]", False))
+    assert part_text(result.content, "word/document.xml") == "[X]"
+
+def test_docx_text_box_paragraph_is_matched_on_its_own():
+    body_xml = ('<w:p><w:r><w:t>Outer Jo</w:t></w:r>'
+                '<w:r><w:pict><w:txbxContent><w:p><w:r><w:t>Inner John Doe</w:t></w:r></w:p></w:txbxContent></w:pict></w:r>'
+                '<w:r><w:t>hn Doe</w:t></w:r></w:p>')
+    result = redact_task((docx_with_body(body_xml), ".docx", ("John Doe",), "[X]", False))
+    assert part_text(result.content, "word/document.xml") == "Outer [X]Inner [X]"
+
+def test_docx_name_with_non_breaking_hyphen():
+    body_xml = ('<w:p><w:r><w:t>Jean</w:t><w:noBreakHyphen/><w:t>Luc Picard signed</w:t></w:r></w:p>'
+                '<w:p><w:r><w:t>Mary</w:t><w:noBreakHyphen/><w:t>Ann</w:t></w:r></w:p>')
+    result = redact_task((docx_with_body(body_xml), ".docx", ("Jean-Luc Picard", "Picard", "Mary-Ann"), "[X]", False))
+    assert part_text(result.content, "word/document.xml") == "[X] signed[X]"
+    with zipfile.ZipFile(io.BytesIO(result.content)) as package_zip:
+        assert b"noBreakHyphen" not in package_zip.read("word/document.xml") # Covered by the matches, so removed
+
+def test_docx_non_breaking_hyphen_outside_a_match_is_kept():
+    body_xml = '<w:p><w:r><w:t>Doe</w:t><w:noBreakHyphen/><w:t>Smith and Doe</w:t></w:r></w:p>'
+    result = redact_task((docx_with_body(body_xml), ".docx", ("Doe",), "[X]", False))
+    with zipfile.ZipFile(io.BytesIO(result.content)) as package_zip:
+        part_xml = package_zip.read("word/document.xml")
+    assert b"noBreakHyphen" in part_xml
+    assert part_text(result.content, "word/document.xml") == "[X]Smith and [X]"
+
+def test_pptx_round_trip_through_redact_task():
+    slide_xml = (
+        f'<p:sld xmlns:p="{P_NS}" xmlns:a="{A_NS}"><p:cSld><p:spTree><p:sp><p:txBody>'
+        '<a:p><a:r><a:t>Presented by Dr. </a:t></a:r><a:r><a:t>Doe</a:t></a:r></a:p>'
+        '</p:txBody></p:sp></p:spTree></p:cSld></p:sld>')
+    pptx_bytes = ooxml_package(
+        "application/vnd.openxmlformats-officedocument.presentationml.slide+xml", "ppt/slides/slide1.xml", slide_xml)
+    result = redact_task((pptx_bytes, ".pptx", ("Dr. Doe", "Doe"), "[X]", False))
+    assert result.names_found
+    assert part_text(result.content, "ppt/slides/slide1.xml") == "Presented by [X]"
+
+def test_unchanged_package_is_not_rewritten():
+    docx_bytes = docx_with_body('<w:p><w:r><w:t>Nobody here</w:t></w:r></w:p>')
+    assert redact_task((docx_bytes, ".docx", ("John Doe",), "[X]", False)) == (None, False)
@@ -0,0 +1,79 @@
+import fitz
+import pytest
+
+import redaction
+from redaction import redact_task
+
+NAMES = ("John Doe", "Doe")
+
+def pdf_task(pdf_bytes, clean_pdf_output=False):
+    return (pdf_bytes, ".pdf", NAMES, "[X]", clean_pdf_output)
+
+def stream_mentions(stream, word):
+    """Whether a decompressed PDF stream holds word as literal text or as a hex string (as PyMuPDF writes it)."""
+    hex_word = word.encode().hex().encode()
+    return word.encode() in stream or hex_word in stream.lower()
+
+def streams_mentioning(pdf_bytes, word):
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        return [xref for xref in range(1, doc.xref_length()) if doc.xref_is_stream(xref) and stream_mentions(doc.xref_stream(xref), word)]
+
+def page_texts(pdf_bytes):
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        return [page.get_text() for page in doc]
+
+@pytest.fixture
+def long_pdf_with_form_xobject():
+    """41 pages; only the first names John Doe, in its own content and in a Form XObject drawn on it."""
+    with fitz.open() as doc, fitz.open() as form_source:
+        first_page = doc.new_page()
+        first_page.insert_text((50, 50), "Signed by John Doe today")
+        form_source.new_page(width=300, height=100).insert_text((10, 50), "Form field John Doe value")
+        first_page.show_pdf_page(fitz.Rect(50, 100, 350, 200), form_source, 0) # Embedded as a Form XObject
+        for page_num in range(40):
+            doc.new_page().insert_text((50, 50), f"Filler page {page_num}")
+        return doc.tobytes()
+
+@pytest.mark.parametrize("clean_pdf_output", [False, True])
+def test_redacted_name_is_in_no_output_stream(long_pdf_with_form_xobject, clean_pdf_output):
+    assert len(streams_mentioning(long_pdf_with_form_xobject, "John")) == 2 # Page content and Form XObject
+    result = redact_task(pdf_task(long_pdf_with_form_xobject, clean_pdf_output))
+    assert result.names_found
+    # One redacted page out of 41 takes the light garbage=1 save: the replaced streams must still be dropped
+    assert 1 < redaction.PDF_LIGHT_SAVE_MAX_REDACTED_PAGE_RATIO * 41
+    assert streams_mentioning(result.content, "John") == []
+    assert streams_mentioning(result.content, "Doe") == []
+    texts = page_texts(result.content)
+    assert len(texts) == 41
+    assert "Signed by" in texts[0] and "Form field" in texts[0] and "Filler page 39" in texts[40]
+
+def test_only_the_name_characters_are_blacked_out():
+    with fitz.open() as doc:
+        doc.new_page().insert_text((50, 50), "Witness (Doe, J.) signed")
+        pdf_bytes = doc.tobytes()
+    result = redact_task(pdf_task(pdf_bytes))
+    text = " ".join(page_texts(result.content)[0].split())
+    assert "Doe" not in text
+    assert text.startswith("Witness (") and ", J.) signed" in text
+
+def test_name_wrapped_across_lines_is_blacked_out_on_both():
+    with fitz.open() as doc:
+        page = doc.new_page()
+        page.insert_text((50, 50), "The report was written by John")
+        page.insert_text((50, 64), "Doe and reviewed by Janet")
+        pdf_bytes = doc.tobytes()
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        matcher = redaction.create_name_matcher(("John Doe",))
+        page_chars_text, char_boxes = redaction.pdf_chars_text(doc[0].get_text("rawdict", flags=redaction.PDF_TEXT_FLAGS))
+        rects = redaction.pdf_rects_for_spans(char_boxes, redaction.find_name_spans(page_chars_text, matcher))
+    assert len(rects) == 2 # One per line
+    result = redact_task((pdf_bytes, ".pdf", ("John Doe",), "[X]", False))
+    text = " ".join(page_texts(result.content)[0].split())
+    assert "John" not in text and "Doe" not in text
+    assert "written by" in text and "and reviewed by Janet" in text
+
+def test_pdf_without_names_is_not_rewritten():
+    with fitz.open() as doc:
+        doc.new_page().insert_text((50, 50), "Nobody here, not even Doer")
+        pdf_bytes = doc.tobytes()
+    assert redact_task(pdf_task(pdf_bytes)) == (None, False)